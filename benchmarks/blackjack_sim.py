@@ -0,0 +1,237 @@
+"""Blackjack house edge simulator
+
+Plays millions of rounds of blackjack with NumPy arrays instead of Card
+objects, following the game's rules exactly:
+    bj_add       adds up the two first cards of a hand
+    hit_user     counts a player's aces down to 1 while they're over 21,
+                 and reaching 21 ends the turn
+    deal_cards   a dealer ace with a J, Q or K is blackjack and every
+                 player loses before anyone plays
+    dealer_draw  the dealer draws to 17, new aces count 11 if they fit
+                 and are never counted down
+    make_payout  the bet is paid back times 2.5 for a blackjack, 2 for
+                 a win, 1 for a push and 0 for a loss or bust
+Cards are drawn with replacement, like STANDARD_52_DECK does.
+
+Reports the house edge (what the house keeps of every chip bet), the
+variance of a round and how many rounds per second were played. The
+payouts can be changed on the command line to try out rule changes.
+
+Run from the root of the repo:
+    python -m benchmarks.blackjack_sim [--rounds N] [--strategy hint|dealer|stand]
+"""
+import argparse
+import random
+import sys
+import time
+import numpy as np
+from games.blackjack import BJ_RANKS
+from games.blackjack import EV_TABLE
+from games.blackjack import EV_UP_CARDS
+from games.blackjack import bj_add
+from games.blackjack import dealer_add
+from games.blackjack import hint_values
+from games.blackjack import player_add
+from util import STANDARD_52_DECK
+
+
+# value of each card in BJ_RANKS order, aces as 11
+CARD_VALUES = np.array([11, 2, 3, 4, 5, 6, 7, 8, 9, 10, 10, 10, 10], dtype=np.int8)
+# index of each card in EV_UP_CARDS
+UP_CARD_INDEX = np.array([EV_UP_CARDS.index(rank) for rank in BJ_RANKS], dtype=np.int8)
+ACE = 0
+FACES = (10, 11, 12)
+OUTCOMES = ("blackjack", "win", "push", "loss", "bust", "dealer blackjack")
+
+
+def hint_hits():
+    """
+    Returns a (2, 22, up cards) bool array of where the EV table says to hit
+    """
+    if EV_TABLE is None:
+        raise SystemExit("The hint strategy needs configs/blackjack_ev.npy, "
+                         "run python build_tables.py blackjack")
+    # rows the table doesn't fill (e.g. soft 5) are NaN and never looked up
+    return np.nan_to_num(EV_TABLE[..., 1]) > np.nan_to_num(EV_TABLE[..., 0])
+
+
+def strategy_hits(strategy):
+    """
+    Returns a (2, 22, up cards) bool array, True where a player with
+    that [soft, hand value, up card] hits
+    """
+    if strategy == "hint":
+        return hint_hits()
+    hits = np.zeros((2, 22, len(EV_UP_CARDS)), dtype=bool)
+    if strategy == "dealer":
+        hits[:, :17] = True
+    return hits
+
+
+def play_rounds(count, hits, rng):
+    """
+    Plays count rounds of one player against the dealer and returns an
+    array with the index in OUTCOMES of each round
+    """
+    up = rng.integers(0, 13, count)
+    hidden = rng.integers(0, 13, count)
+    first = rng.integers(0, 13, count)
+    second = rng.integers(0, 13, count)
+    outcome = np.full(count, OUTCOMES.index("loss"), dtype=np.int8)
+
+    # the dealer's blackjack check in deal_cards only knows ace + face
+    up_face = np.isin(up, FACES)
+    hidden_face = np.isin(hidden, FACES)
+    dealer_natural = ((up == ACE) & hidden_face) | ((hidden == ACE) & up_face)
+    outcome[dealer_natural] = OUTCOMES.index("dealer blackjack")
+
+    # bj_add: two aces make 12 (one counted as 11), anything else just adds up
+    player = (CARD_VALUES[first] + CARD_VALUES[second]).astype(np.int16)
+    aces = (first == ACE).astype(np.int8) + (second == ACE)
+    two_aces = aces == 2
+    player[two_aces] = 12
+    aces[two_aces] = 1
+    natural = ~dealer_natural & (player == 21)
+    outcome[natural] = OUTCOMES.index("blackjack")
+
+    # players hit until the strategy says stand, they bust or reach 21
+    up_index = UP_CARD_INDEX[up]
+    playing = ~dealer_natural & ~natural
+    while True:
+        deciding = np.flatnonzero(playing)
+        deciding = deciding[hits[(aces[deciding] > 0).astype(np.intp), player[deciding],
+                                 up_index[deciding]]]
+        playing[:] = False
+        if len(deciding) == 0:
+            break
+        card = rng.integers(0, 13, len(deciding))
+        player[deciding] += CARD_VALUES[card]
+        aces[deciding] += card == ACE
+        # at most one ace needs counting down after a single card
+        over = deciding[(player[deciding] > 21) & (aces[deciding] > 0)]
+        player[over] -= 10
+        aces[over] -= 1
+        playing[deciding] = player[deciding] < 21
+    bust = ~dealer_natural & ~natural & (player > 21)
+    outcome[bust] = OUTCOMES.index("bust")
+
+    # dealer_draw plays every round without a dealer blackjack
+    dealer = (CARD_VALUES[up] + CARD_VALUES[hidden]).astype(np.int16)
+    dealer[(up == ACE) & (hidden == ACE)] = 12
+    drawing = np.flatnonzero(~dealer_natural & (dealer < 17))
+    while len(drawing):
+        card = rng.integers(0, 13, len(drawing))
+        value = CARD_VALUES[card].astype(np.int16)
+        value[(card == ACE) & (dealer[drawing] + 11 > 21)] = 1
+        dealer[drawing] += value
+        drawing = drawing[dealer[drawing] < 17]
+    # make_payout counts a dealer bust as 0
+    dealer[dealer > 21] = 0
+
+    compared = ~dealer_natural & ~natural & ~bust
+    outcome[compared & (player > dealer)] = OUTCOMES.index("win")
+    outcome[compared & (player == dealer)] = OUTCOMES.index("push")
+    return outcome
+
+
+def scalar_round(strategy):
+    """
+    Plays one round with Card objects and the game's own functions,
+    returns the index in OUTCOMES
+    """
+    (up, hidden, first, second) = STANDARD_52_DECK.draw(4)
+    if (up.value == "A" and hidden.value in ("J", "Q", "K")
+            or hidden.value == "A" and up.value in ("J", "Q", "K")):
+        return OUTCOMES.index("dealer blackjack")
+    (aces, player) = bj_add([first, second])
+    if player == 21:
+        return OUTCOMES.index("blackjack")
+    while player < 21:
+        if strategy == "stand":
+            break
+        if strategy == "dealer" and player >= 17:
+            break
+        if strategy == "hint":
+            expected = hint_values(player, aces > 0, up.value)
+            if expected["hit"] <= expected["stand"]:
+                break
+        (player, aces) = player_add(player, aces, STANDARD_52_DECK.draw(1)[0].value)
+    if player > 21:
+        return OUTCOMES.index("bust")
+    (_, dealer) = bj_add([up, hidden])
+    while dealer < 17:
+        dealer = dealer_add(dealer, STANDARD_52_DECK.draw(1)[0].value)
+    if dealer > 21:
+        dealer = 0
+    if player > dealer:
+        return OUTCOMES.index("win")
+    if player == dealer:
+        return OUTCOMES.index("push")
+    return OUTCOMES.index("loss")
+
+
+def report(name, outcomes, seconds, payouts):
+    """
+    Prints the outcome frequencies, house edge and variance of a batch
+    of rounds
+    """
+    rounds = len(outcomes)
+    frequencies = np.bincount(outcomes, minlength=len(OUTCOMES)) / rounds
+    # what the player gets back minus their bet, per chip bet
+    net = payouts - 1
+    mean = float(frequencies @ net)
+    variance = float(frequencies @ (net - mean) ** 2)
+    print(f"\n{name}: {rounds:,} rounds, {rounds / seconds:,.0f} rounds/sec")
+    for (outcome, frequency) in zip(OUTCOMES, frequencies):
+        print(f"\t{outcome:<18}{frequency:>9.4%}")
+    print(f"\thouse edge        {-mean:>9.4%} +- {(variance / rounds) ** 0.5:.4%}")
+    print(f"\tvariance          {variance:>9.4f}")
+    return -mean
+
+
+def main(args):
+    """
+    Runs the simulator and prints the report
+    """
+    parser = argparse.ArgumentParser(description="Simulate blackjack rounds with NumPy")
+    parser.add_argument("--rounds", type=int, default=10000000,
+                        help="amount of rounds to play (default 10,000,000)")
+    parser.add_argument("--batch", type=int, default=1000000,
+                        help="rounds played at once (default 1,000,000)")
+    parser.add_argument("--strategy", choices=("hint", "dealer", "stand"), default="hint",
+                        help="when the player hits: what the Hint button says, "
+                             "below 17 like the dealer, or never (default hint)")
+    parser.add_argument("--blackjack-payout", type=float, default=2.5,
+                        help="bet multiplier paid for a blackjack (default 2.5)")
+    parser.add_argument("--win-payout", type=float, default=2,
+                        help="bet multiplier paid for a win (default 2)")
+    parser.add_argument("--push-payout", type=float, default=1,
+                        help="bet multiplier paid for a push (default 1)")
+    parser.add_argument("--check", type=int, default=0,
+                        help="also play this many rounds with Card objects to compare")
+    parser.add_argument("--seed", type=int, default=0, help="seed for the cards")
+    args = parser.parse_args(args)
+
+    # payout multiplier of each outcome, in OUTCOMES order
+    payouts = np.array([args.blackjack_payout, args.win_payout, args.push_payout, 0, 0, 0])
+    hits = strategy_hits(args.strategy)
+    rng = np.random.default_rng(args.seed)
+    batches = []
+    start = time.perf_counter()
+    for done in range(0, args.rounds, args.batch):
+        batches.append(play_rounds(min(args.batch, args.rounds - done), hits, rng))
+    elapsed = time.perf_counter() - start
+    edge = report(f"NumPy, {args.strategy} strategy", np.concatenate(batches), elapsed, payouts)
+
+    if args.check:
+        random.seed(args.seed)
+        start = time.perf_counter()
+        outcomes = np.array([scalar_round(args.strategy) for _ in range(args.check)])
+        elapsed = time.perf_counter() - start
+        scalar_edge = report("Card objects", outcomes, elapsed, payouts)
+        print(f"\nDifference in house edge: {scalar_edge - edge:+.4%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
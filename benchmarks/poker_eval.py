@@ -0,0 +1,230 @@
+"""Poker hand evaluator benchmark
+
+Checks every poker hand evaluator against the known hand category
+totals and reports how many hands per second each of them scores.
+
+All 2,598,960 five card hands are enumerated and counted by category,
+then a random sample of seven card hands is scored by every evaluator
+and compared against the slow reference (the best max_hand value out
+of all 21 five card combinations).
+
+Run from the root of the repo:
+    python -m benchmarks.poker_eval [--samples N] [--reference-samples N]
+"""
+import argparse
+import itertools
+import sys
+import time
+import numpy as np
+from games.poker import card_to_id
+from games.poker import evaluate_hand
+from games.poker import evaluate_hands
+from games.poker import id_to_card
+from games.poker import max_hand
+from util import Card
+
+
+CATEGORY_NAMES = ("High Card", "One Pair", "Two Pair", "Three of a Kind", "Straight",
+                  "Flush", "Full House", "Four of a Kind", "Straight Flush", "Royal Flush")
+
+# amount of 5 card hands in each category (index 0 is high card)
+FIVE_CARD_TOTALS = (1302540, 1098240, 123552, 54912, 10200,
+                    5108, 3744, 624, 36, 4)
+# amount of distinct hand values a 5 card evaluator should produce
+FIVE_CARD_DISTINCT_VALUES = 7462
+
+# amount of 7 card hands in each category, out of 133,784,560
+SEVEN_CARD_TOTALS = (23294460, 58627800, 31433400, 6461620, 6180020,
+                     4047644, 3473184, 224848, 37260, 4324)
+
+# pairs of hands (as strings of rank and suit) where the first hand
+# must lose to the second one
+ORDERING_CHECKS = (
+    ("AD 2H 3S 4C 5D", "2D 3H 4S 5C 6D"),       # wheel is the lowest straight
+    ("KD QH JS 9C 8D", "AD 2H 3S 4C 5D"),       # but it still beats high card
+    ("AS 2S 3S 4S 5S", "2H 3H 4H 5H 6H"),       # same for straight flushes
+    ("AD AH AS 3C 2D", "AD AH AS 4C 2D"),       # trips, highest kicker first
+    ("7D 7H 7S 3C QD", "7D 7H 7S 2C KD"),       # ...not the lowest one
+    ("9D 9H 9S 9C 2D", "9D 9H 9S 9C 3D"),       # quads kicker
+    ("KD KH 2S 2C AD", "KD KH 3S 3C 4D"),       # second pair before the kicker
+    ("AD AH KS QC 9D", "AD AH KS QC JD"),       # pair kickers
+)
+
+
+def parse_hand(hand_str):
+    """
+    Turns a string such as "AD 10H 3S" into a list of Card objects
+    """
+    return [Card(card[-1], card[:-1]) for card in hand_str.split()]
+
+
+def category(value):
+    """
+    Returns the category index (0 = high card) of an encoded hand value
+    """
+    return value // (13**5) - 1
+
+
+def report(name, totals, expected):
+    """
+    Prints category counts next to the expected totals and returns
+    whether every category matched
+    """
+    print(f"\n{name}:")
+    matched = True
+    for (index, cat_name) in enumerate(CATEGORY_NAMES):
+        ok = totals[index] == expected[index]
+        matched = matched and ok
+        print(f"\t{cat_name:<16}{totals[index]:>10} / {expected[index]:<10}"
+              f"{'' if ok else 'MISMATCH'}")
+    return matched
+
+
+def reference_best(cards):
+    """
+    The original best_hand: max_hand over every 5 card combination
+    """
+    return max(max_hand(list(c)) for c in itertools.combinations(cards, 5))
+
+
+def check_ordering():
+    """
+    Checks that the hands in ORDERING_CHECKS rank in the right order
+    with every evaluator
+    """
+    print("\nOrdering checks:")
+    passed = True
+    for (low, high) in ORDERING_CHECKS:
+        low_cards = parse_hand(low)
+        high_cards = parse_hand(high)
+        low_ids = [card_to_id(c) for c in low_cards]
+        high_ids = [card_to_id(c) for c in high_cards]
+        ok = (max_hand(low_cards) < max_hand(high_cards)
+              and evaluate_hand(low_ids) < evaluate_hand(high_ids)
+              and evaluate_hands([low_ids])[0] < evaluate_hands([high_ids])[0])
+        passed = passed and ok
+        print(f"\t{low:<16} < {high:<16}{'ok' if ok else 'FAILED'}")
+    return passed
+
+
+def bench_five_card(run_reference):
+    """
+    Enumerates every 5 card hand with each evaluator
+    """
+    passed = True
+    hand_count = sum(FIVE_CARD_TOTALS)
+    ids = np.fromiter(itertools.chain.from_iterable(itertools.combinations(range(52), 5)),
+                      dtype=np.int8, count=hand_count * 5).reshape(hand_count, 5)
+
+    start = time.perf_counter()
+    batch_values = evaluate_hands(ids)
+    elapsed = time.perf_counter() - start
+    totals = np.bincount(batch_values // (13**5) - 1, minlength=10)
+    passed &= report(f"evaluate_hands, 5 cards ({hand_count / elapsed:,.0f} hands/sec)",
+                     totals, FIVE_CARD_TOTALS)
+    distinct = len(np.unique(batch_values))
+    print(f"\tdistinct values: {distinct} / {FIVE_CARD_DISTINCT_VALUES}")
+    passed &= distinct == FIVE_CARD_DISTINCT_VALUES
+
+    rows = ids.tolist()
+    start = time.perf_counter()
+    values = [evaluate_hand(row) for row in rows]
+    elapsed = time.perf_counter() - start
+    totals = [0] * 10
+    for value in values:
+        totals[category(value)] += 1
+    passed &= report(f"evaluate_hand, 5 cards ({hand_count / elapsed:,.0f} hands/sec)",
+                     totals, FIVE_CARD_TOTALS)
+    matches = bool(np.array_equal(np.array(values, dtype=np.int32), batch_values))
+    print(f"\tsame values as evaluate_hands: {matches}")
+    passed &= matches
+
+    if run_reference:
+        deck = [id_to_card(card_id) for card_id in range(52)]
+        start = time.perf_counter()
+        mismatches = 0
+        totals = [0] * 10
+        for (row, fast_value) in zip(rows, values):
+            value = max_hand([deck[card_id] for card_id in row])
+            totals[category(value)] += 1
+            mismatches += value != fast_value
+        elapsed = time.perf_counter() - start
+        passed &= report(f"max_hand, 5 cards ({hand_count / elapsed:,.0f} hands/sec)",
+                         totals, FIVE_CARD_TOTALS)
+        print(f"\tvalues that differ from evaluate_hand: {mismatches}")
+        passed &= mismatches == 0
+    return passed
+
+
+def bench_seven_card(samples, reference_samples, seed):
+    """
+    Scores a random sample of 7 card hands with each evaluator
+    """
+    passed = True
+    rng = np.random.default_rng(seed)
+    ids = np.argsort(rng.random((samples, 52)), axis=1)[:, :7]
+
+    start = time.perf_counter()
+    batch_values = evaluate_hands(ids)
+    elapsed = time.perf_counter() - start
+    print(f"\nevaluate_hands, 7 cards: {samples / elapsed:,.0f} hands/sec")
+
+    rows = ids.tolist()
+    start = time.perf_counter()
+    values = [evaluate_hand(row) for row in rows]
+    elapsed = time.perf_counter() - start
+    print(f"evaluate_hand, 7 cards: {samples / elapsed:,.0f} hands/sec")
+    matches = bool(np.array_equal(np.array(values, dtype=np.int32), batch_values))
+    print(f"\tsame values as evaluate_hands: {matches}")
+    passed &= matches
+
+    # a sample can't match the exact totals, so compare the frequencies
+    # and allow 5 standard errors of difference for each category
+    print("\nSampled 7 card frequencies:")
+    totals = np.bincount(batch_values // (13**5) - 1, minlength=10)
+    all_hands = sum(SEVEN_CARD_TOTALS)
+    for (index, cat_name) in enumerate(CATEGORY_NAMES):
+        expected = SEVEN_CARD_TOTALS[index] / all_hands
+        observed = totals[index] / samples
+        tolerance = 5 * (expected * (1 - expected) / samples) ** 0.5
+        ok = abs(observed - expected) <= tolerance
+        passed &= ok
+        print(f"\t{cat_name:<16}{observed:>10.6f} / {expected:<10.6f}"
+              f"{'' if ok else 'OUT OF RANGE'}")
+
+    deck = [id_to_card(card_id) for card_id in range(52)]
+    start = time.perf_counter()
+    mismatches = 0
+    for (row, fast_value) in zip(rows[:reference_samples], values):
+        mismatches += reference_best([deck[card_id] for card_id in row]) != fast_value
+    elapsed = time.perf_counter() - start
+    checked = min(samples, reference_samples)
+    print(f"\nmax_hand over 21 combinations, 7 cards: {checked / elapsed:,.0f} hands/sec")
+    print(f"\tvalues that differ from evaluate_hand: {mismatches} / {checked}")
+    passed &= mismatches == 0
+    return passed
+
+
+def main(args):
+    """
+    Runs every check and returns the exit code
+    """
+    parser = argparse.ArgumentParser(description="Check and time the poker hand evaluators")
+    parser.add_argument("--samples", type=int, default=1000000,
+                        help="amount of random 7 card hands to score (default 1,000,000)")
+    parser.add_argument("--reference-samples", type=int, default=20000,
+                        help="amount of those hands to also score with max_hand (default 20,000)")
+    parser.add_argument("--skip-reference", action="store_true",
+                        help="don't run max_hand over every 5 card hand (the slowest part)")
+    parser.add_argument("--seed", type=int, default=0, help="seed for the 7 card sample")
+    args = parser.parse_args(args)
+
+    passed = check_ordering()
+    passed &= bench_five_card(not args.skip_reference)
+    passed &= bench_seven_card(args.samples, args.reference_samples, args.seed)
+    print("\nAll checks passed." if passed else "\nSOME CHECKS FAILED.")
+    return 0 if passed else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
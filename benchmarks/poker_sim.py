@@ -0,0 +1,228 @@
+"""Poker table simulator
+
+Plays full Texas Hold'em hands (blinds, betting, dealing, showdown and
+payouts) without discord, using the same PokerGame and BettingRound
+logic as PokerManager, and reports how many hands per second the rules
+can get through and where the time goes.
+
+Every seat uses the same action policy:
+    call    always call or check (a scripted table, every hand goes to showdown)
+    random  fold, call or raise at random
+    cpu     the CPU player decision (choose_cpu_bet) with preflop table equity
+    fuzz    fold, call, min raise, random raise or all in, and now and then
+            a raise it isn't allowed to make, which check_bet has to refuse
+
+Players that lose all of their chips buy back in so the table stays full.
+With --random-stacks every buy in is a random amount between the big
+blind and --chips, so short all ins (which don't reopen the raising for
+players that already acted) come up often.
+With --history every hand is also written to the hand history files
+(see HAND_HISTORY_PATH), which shows what recording costs the game.
+
+Run from the root of the repo:
+    python -m benchmarks.poker_sim [--hands N] [--players N] [--policy call|random|cpu|fuzz]
+"""
+import argparse
+import random
+import sys
+import time
+from games.poker import BIG_BLIND
+from games.poker import PokerGame
+from games.poker import PokerPlayer
+from games.poker import choose_cpu_bet
+from games.poker import preflop_equity
+from util import CpuUser
+
+
+PHASES = ("deal", "betting", "board", "showdown")
+
+
+def call_policy(game, player, rng):
+    """
+    Always calls (or checks)
+    """
+    return game.betting.to_call(player)
+
+
+def random_policy(game, player, rng):
+    """
+    Folds to a bet a tenth of the time, raises a fifth of the time and
+    calls otherwise
+    """
+    betting = game.betting
+    to_call = betting.to_call(player)
+    chips = game.player_data[player].chips
+    roll = rng.random()
+    if roll < 0.1 and to_call > 0:
+        return -1
+    if roll < 0.3 and chips > to_call + betting.min_raise and betting.can_raise(player):
+        return min(to_call + rng.randint(betting.min_raise, max(game.pool, betting.min_raise)),
+                   chips)
+    return to_call
+
+
+def cpu_policy(game, player, rng):
+    """
+    The CPU player decision, using the preflop table equity on every
+    street so the simulator doesn't wait on the equity pool
+    """
+    betting = game.betting
+    player_data = game.player_data[player]
+    opponents = max(betting.contenders - 1, 1)
+    equity = preflop_equity(player_data.hand, opponents)
+    if equity is None:
+        equity = 1 / (opponents + 1)
+    amount = choose_cpu_bet(equity, betting.to_call(player), betting.min_raise, game.pool,
+                            player_data.chips, betting.seat_index[player],
+                            len(betting.seat_order))
+    # the same cap run_cpu_turns puts on a CPU that can't raise
+    if not betting.can_raise(player):
+        amount = min(amount, betting.to_call(player))
+    return amount
+
+
+def fuzz_policy(game, player, rng):
+    """
+    Picks any kind of action: fold, all in, a min or random raise (even
+    when the player isn't allowed to raise, or it's too small) or call
+    """
+    betting = game.betting
+    to_call = betting.to_call(player)
+    chips = game.player_data[player].chips
+    roll = rng.random()
+    if roll < 0.1 and to_call > 0:
+        return -1
+    if roll < 0.25:
+        return chips
+    if roll < 0.5:
+        raise_amount = rng.choice((betting.min_raise, rng.randint(1, max(game.pool, 1))))
+        return min(to_call + raise_amount, chips)
+    return to_call
+
+
+POLICIES = {"call": call_policy, "random": random_policy, "cpu": cpu_policy,
+            "fuzz": fuzz_policy}
+
+
+def simulate(hands, players, policy, chips, seed, history=False, random_stacks=False):
+    """
+    Plays hands at one table and returns the time spent in each phase
+    along with some counts about the hands.
+
+    Bets check_bet refuses are only allowed from the fuzz policy, the
+    player then calls instead. Whether a player may raise is also worked
+    out here without BettingRound (players that acted since the last
+    full raise can't) and compared with can_raise before every action.
+    """
+    def buy_in():
+        return rng.randint(BIG_BLIND, chips) if random_stacks else chips
+
+    rng = random.Random(seed)
+    random.seed(seed)
+    game = PokerGame(0, record_history=history)
+    for number in range(1, players + 1):
+        seat = CpuUser(number)
+        game.player_data[seat] = PokerPlayer(is_cpu=True)
+        game.player_data[seat].chips = buy_in()
+        game.turn_order.append(seat)
+    timings = dict.fromkeys(PHASES, 0.0)
+    counts = {"actions": 0, "folds": 0, "all ins": 0, "short all ins": 0,
+              "refused bets": 0, "showdowns": 0, "rebuys": 0}
+    clock = time.perf_counter
+
+    for _ in range(hands):
+        start = clock()
+        game.reset_hand()
+        game.start_hand()
+        betting = game.betting
+        timings["deal"] += clock() - start
+
+        while True:
+            start = clock()
+            # players that acted since the last full raise this street
+            acted = set()
+            while betting.current is not None:
+                player = betting.current
+                if betting.can_raise(player) == (player in acted):
+                    raise ValueError(f"can_raise({player}) is {betting.can_raise(player)}, "
+                                     f"acted since the last full raise: {player in acted}")
+                amount = policy(game, player, rng)
+                counts["actions"] += 1
+                if amount < 0:
+                    game.fold(player)
+                    counts["folds"] += 1
+                    continue
+                error = betting.check_bet(player, amount)
+                if error is not None:
+                    if policy is not fuzz_policy:
+                        raise ValueError(f"{player} made a bad bet of {amount}: {error}")
+                    counts["refused bets"] += 1
+                    amount = betting.to_call(player)
+                raised_by = game.player_data[player].round_bet + amount - betting.largest_bet
+                if raised_by >= betting.min_raise:
+                    acted.clear()
+                elif raised_by > 0:
+                    counts["short all ins"] += 1
+                acted.add(player)
+                game.bet(player, amount)
+                counts["all ins"] += game.player_data[player].chips == 0
+            timings["betting"] += clock() - start
+            if game.is_hand_over():
+                break
+            start = clock()
+            game.deal_street()
+            timings["board"] += clock() - start
+
+        start = clock()
+        counts["showdowns"] += betting.contenders > 1
+        game.settle()
+        timings["showdown"] += clock() - start
+
+        for seat in game.turn_order:
+            if game.player_data[seat].chips == 0:
+                game.player_data[seat].chips = buy_in()
+                counts["rebuys"] += 1
+    return (timings, counts)
+
+
+def main(args):
+    """
+    Runs the simulator and prints the report
+    """
+    parser = argparse.ArgumentParser(description="Play headless poker hands and time them")
+    parser.add_argument("--hands", type=int, default=20000,
+                        help="amount of hands to play (default 20,000)")
+    parser.add_argument("--players", type=int, default=6,
+                        help="players at the table, 2 to 23 (default 6)")
+    parser.add_argument("--policy", choices=sorted(POLICIES), default="random",
+                        help="how every seat picks its actions (default random)")
+    parser.add_argument("--chips", type=int, default=10000,
+                        help="chips each player starts (and buys back in) with (default 10,000)")
+    parser.add_argument("--seed", type=int, default=0, help="seed for the cards and actions")
+    parser.add_argument("--random-stacks", action="store_true",
+                        help="buy in for a random amount between the big blind and --chips")
+    parser.add_argument("--history", action="store_true",
+                        help="also write every hand to the hand history files")
+    args = parser.parse_args(args)
+    if not 2 <= args.players <= 23:
+        parser.error("a table needs 2 to 23 players")
+
+    start = time.perf_counter()
+    (timings, counts) = simulate(args.hands, args.players, POLICIES[args.policy],
+                                 args.chips, args.seed, args.history, args.random_stacks)
+    elapsed = time.perf_counter() - start
+
+    print(f"{args.hands} hands, {args.players} players, {args.policy} policy")
+    print(f"{args.hands / elapsed:,.0f} hands/sec ({elapsed:.2f}s)")
+    print("\nTime per phase:")
+    for phase in PHASES:
+        print(f"\t{phase:<10}{timings[phase]:>8.3f}s {100 * timings[phase] / elapsed:>6.1f}%"
+              f"{1e6 * timings[phase] / args.hands:>10.1f} us/hand")
+    print("\nPer hand:")
+    for (name, count) in counts.items():
+        print(f"\t{name:<14}{count / args.hands:>8.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
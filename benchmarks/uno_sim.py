@@ -0,0 +1,197 @@
+"""Uno self-play simulator
+
+Plays complete games of Uno without discord, using the same UnoGame
+rules (setup, draw_cards, play_card, next_turn) as UnoManager, and
+reports how many games per second the rules can get through, how long
+games last and how often the discard pile gets shuffled back in.
+
+Every seat uses the same policy:
+    first   play the first playable card in the hand, Wild cards take
+            the color the player has the most of
+    random  play a random playable card, Wild cards take a random color
+    cpu     the CPU player move (choose_cpu_move)
+A player that can't play draws a card and their turn ends, like the
+"Draw" button. With --cpu-seats the first seats play the cpu policy
+instead, and the report shows how often they win.
+
+With --check the state of the game is checked after every turn (every
+card is somewhere, hands match their masks, the turn index is valid)
+and the simulator stops at the first problem.
+
+Run from the root of the repo:
+    python -m benchmarks.uno_sim [--games N] [--players N] [--policy first|random|cpu]
+"""
+import argparse
+import random
+import sys
+import time
+from games.uno import UNO_COLORS
+from games.uno import UNO_DECK
+from games.uno import UNO_KIND_CARDS
+from games.uno import UnoGame
+from games.uno import UnoPlayer
+from games.uno import choose_cpu_move
+from util import CpuUser
+
+
+# games still going after this many turns are given up on
+MAX_TURNS = 5000
+
+
+def most_common_color(hand):
+    """
+    Returns the color the hand has the most cards of
+    """
+    counts = dict.fromkeys(UNO_COLORS, 0)
+    for (index, count) in hand.kinds():
+        color = UNO_KIND_CARDS[index].name
+        if color in counts:
+            counts[color] += count
+    return max(UNO_COLORS, key=counts.get)
+
+
+def first_policy(game, user, rng):
+    """
+    Plays the first playable card
+    """
+    player = game.player_data[user]
+    playable = player.hand.playable(game.top_card)
+    if not playable:
+        return (None, None)
+    card = UNO_KIND_CARDS[(playable & -playable).bit_length() - 1]
+    if card.name != "Wild":
+        return (card, None)
+    return (card, most_common_color(player.hand))
+
+
+def random_policy(game, user, rng):
+    """
+    Plays a random playable card
+    """
+    player = game.player_data[user]
+    cards = list(player.hand.cards_in(player.hand.playable(game.top_card)))
+    if not cards:
+        return (None, None)
+    return (rng.choice(cards), rng.choice(UNO_COLORS))
+
+
+def cpu_policy(game, user, rng):
+    """
+    Plays what a CPU player would
+    """
+    return choose_cpu_move(game, user)
+
+
+POLICIES = {"first": first_policy, "random": random_policy, "cpu": cpu_policy}
+
+
+def check_state(game):
+    """
+    Raises ValueError if the game state doesn't add up
+    """
+    deck = game.deck
+    in_hands = 0
+    for (user, player) in game.player_data.items():
+        hand = player.hand
+        if hand.size != sum(hand.counts) or min(hand.counts) < 0:
+            raise ValueError(f"{user}'s hand has {hand.size} cards but counts {hand.counts}")
+        mask = sum(1 << index for (index, count) in enumerate(hand.counts) if count)
+        if mask != hand.mask:
+            raise ValueError(f"{user}'s hand mask {hand.mask:b} doesn't match {mask:b}")
+        in_hands += hand.size
+    on_top = game.top_card.value != "Card"
+    total = len(deck) + deck.discard_size + in_hands + on_top
+    if total != len(UNO_DECK):
+        raise ValueError(f"{total} cards in the game: {len(deck)} in the deck, "
+                         f"{deck.discard_size} discarded, {in_hands} in hands, {int(on_top)} on top")
+    if not 0 <= game.turn_index < len(game.turn_order):
+        raise ValueError(f"turn_index {game.turn_index} is out of range")
+    if game.player_data[game.get_active_player()].skipped:
+        raise ValueError(f"{game.get_active_player()} is taking a turn they were skipped for")
+
+
+def simulate(games, players, policy, seed, check=False, cpu_seats=0):
+    """
+    Plays games at one table and returns counts about them. The first
+    cpu_seats seats play the cpu policy.
+    """
+    rng = random.Random(seed)
+    game = UnoGame(rng=rng)
+    policies = {}
+    for number in range(1, players + 1):
+        seat = CpuUser(number)
+        game.player_data[seat] = UnoPlayer(is_cpu=number <= cpu_seats)
+        game.turn_order.append(seat)
+        game.players += 1
+        policies[seat] = cpu_policy if number <= cpu_seats else policy
+    counts = {"turns": 0, "plays": 0, "draws": 0, "reshuffles": 0,
+              "games with a reshuffle": 0, "unfinished": 0, "cpu seat wins": 0}
+
+    for _ in range(games):
+        game.setup()
+        for turn in range(1, MAX_TURNS + 1):
+            user = game.get_active_player()
+            player = game.player_data[user]
+            (card, color) = policies[user](game, user, rng)
+            if card is None:
+                game.draw_cards(player)
+                counts["draws"] += 1
+                won = False
+            else:
+                won = game.play_card(user, card, color)
+                counts["plays"] += 1
+            game.events.clear()
+            if won:
+                counts["cpu seat wins"] += player.is_cpu
+                break
+            game.next_turn()
+            if check:
+                check_state(game)
+        else:
+            counts["unfinished"] += 1
+        counts["turns"] += turn
+        counts["reshuffles"] += game.deck.reshuffles
+        counts["games with a reshuffle"] += game.deck.reshuffles > 0
+    return counts
+
+
+def main(args):
+    """
+    Runs the simulator and prints the report
+    """
+    parser = argparse.ArgumentParser(description="Play headless Uno games and time them")
+    parser.add_argument("--games", type=int, default=10000,
+                        help="amount of games to play (default 10,000)")
+    parser.add_argument("--players", type=int, default=4,
+                        help="players at the table, 2 to 10 (default 4)")
+    parser.add_argument("--policy", choices=sorted(POLICIES), default="first",
+                        help="how every seat picks its card (default first)")
+    parser.add_argument("--seed", type=int, default=0, help="seed for the cards and plays")
+    parser.add_argument("--cpu-seats", type=int, default=0,
+                        help="seats that play the cpu policy instead (default 0)")
+    parser.add_argument("--check", action="store_true",
+                        help="check the game state after every turn")
+    args = parser.parse_args(args)
+    if not 2 <= args.players <= 10:
+        parser.error("a table needs 2 to 10 players")
+    if not 0 <= args.cpu_seats <= args.players:
+        parser.error("--cpu-seats can't be more than --players")
+
+    start = time.perf_counter()
+    counts = simulate(args.games, args.players, POLICIES[args.policy], args.seed, args.check,
+                      args.cpu_seats)
+    elapsed = time.perf_counter() - start
+
+    print(f"{args.games} games, {args.players} players, {args.policy} policy"
+          f"{f', {args.cpu_seats} cpu seats' if args.cpu_seats else ''}"
+          f"{', state checked every turn' if args.check else ''}")
+    print(f"{args.games / elapsed:,.0f} games/sec, {counts['turns'] / elapsed:,.0f} turns/sec "
+          f"({elapsed:.2f}s)")
+    print("\nPer game:")
+    for (name, count) in counts.items():
+        print(f"\t{name:<24}{count / args.games:>10.3f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -60,9 +60,16 @@ def create_commands(client):
         await client.game_factory.start_game(interaction, game_type=0)
 
     @client.tree.command(name="blackjack", description="Play a game of Blackjack")
-    async def play_blackjack(interaction: discord.Interaction):
+    @discord.app_commands.describe(
+        simultaneous="Everyone takes their turn at the same time (for big tables)",
+        auto_rebet="Everyone bets the same as last round when a new round starts"
+    )
+    async def play_blackjack(interaction: discord.Interaction, simultaneous: bool = False,
+                             auto_rebet: bool = False):
         logging.info("Blackjack slash command used in channel [%i]", interaction.channel_id)
-        await client.game_factory.start_game(interaction, game_type=1)
+        await client.game_factory.start_game(interaction, game_type=1,
+                                             simultaneous_turns=simultaneous,
+                                             auto_rebet=auto_rebet)
 
     @client.tree.command(name="poker", description="Play a game of Poker")
     @discord.app_commands.describe(
@@ -73,9 +80,12 @@ def create_commands(client):
         await client.game_factory.start_game(interaction, game_type=2, cpus=cpus)
 
     @client.tree.command(name="uno", description="Play a game of Uno")
-    async def play_uno(interaction: discord.Interaction):
+    @discord.app_commands.describe(
+        cpus="Amount of cpu players (max of 5)"
+    )
+    async def play_uno(interaction: discord.Interaction, cpus: int = 0):
         logging.info("Uno slash command used in channel [%i]", interaction.channel_id)
-        await client.game_factory.start_game(interaction, game_type=3)
+        await client.game_factory.start_game(interaction, game_type=3, cpus=cpus)
 
     @client.tree.command(name="force-quit", 
                          description="Forcibly quits the current active game in the channel")
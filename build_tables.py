@@ -0,0 +1,46 @@
+"""
+Builds the precomputed tables that the games memory map at startup.
+Only needs to be run when a table is missing or its rules change.
+
+Usage: python build_tables.py [table ...]
+Tables: poker, blackjack (default: all)
+"""
+import sys
+import time
+from games import blackjack
+from games import poker
+
+
+def build_poker():
+    """
+    Preflop equity of every starting hand class
+    """
+    poker.build_preflop_equity_table()
+    return poker.PREFLOP_EQUITY_PATH
+
+
+def build_blackjack():
+    """
+    Expected value of hitting and standing for every hand against every dealer up card
+    """
+    blackjack.build_ev_table()
+    return blackjack.EV_TABLE_PATH
+
+
+TABLES = {
+    "poker": build_poker,
+    "blackjack": build_blackjack,
+}
+
+
+if __name__ == "__main__":
+    names = sys.argv[1:] or list(TABLES)
+    for name in names:
+        if name not in TABLES:
+            print(f"Unknown table {name}. Tables: {', '.join(TABLES)}")
+            sys.exit(1)
+    for name in names:
+        start = time.perf_counter()
+        print(f"Building {name} table...")
+        path = TABLES[name]()
+        print(f"Saved {path} in {time.perf_counter() - start:.1f} seconds.")
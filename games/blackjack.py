@@ -4,16 +4,28 @@ Contains all the logic needed to run a game of Blackjack.
 It features an closed game model, meaning not all users can interact
 with the game at any time, and there is player management.
 """
+import asyncio
 import logging
+from functools import lru_cache
 import discord
+import numpy as np
 from games.game import BaseGame
 from games.game import GameManager
 from games.game import BasePlayer
+from util import Card
+from util import LiveMessage
 from util import double_check
 from util import STANDARD_52_DECK
 from util import cards_to_str_52_standard
 from util import send_info_message
 
+# seconds players get to finish their turns in a simultaneous turn round
+SIMULTANEOUS_TURN_SECONDS = 120
+# bets that can be placed with one button press in the betting phase
+BET_PRESETS = (10, 25, 50, 100)
+# seconds players get to change their automatic rebet before the cards are dealt
+AUTO_REBET_SECONDS = 15
+
 
 class BlackjackPlayer(BasePlayer):
     """
@@ -27,6 +39,12 @@ class BlackjackPlayer(BasePlayer):
         self.hand_value = 0
         self.chips = 300
         self.current_bet = 0
+        # kept between rounds for the rebet buttons
+        self.last_bet = 0
+        # current_bet was placed by auto rebet and can still be replaced
+        self.auto_bet = False
+        # the player is confirming a bet, nothing else can be bet until they answer
+        self.bet_pending = False
         self.current_payout_multiplier = 1
 
     def reset(self):
@@ -37,6 +55,8 @@ class BlackjackPlayer(BasePlayer):
         self.eleven_ace_count = 0
         self.hand_value = 0
         self.current_bet = 0
+        self.auto_bet = False
+        self.bet_pending = False
         self.current_payout_multiplier = 1
 
     def get_debug_str(self):
@@ -45,6 +65,8 @@ class BlackjackPlayer(BasePlayer):
                 f"\t\thand_value: {self.hand_value}\n"
                 f"\t\tchips: {self.chips}\n"
                 f"\t\tcurrent_bet: {self.current_bet}\n"
+                f"\t\tlast_bet: {self.last_bet}\n"
+                f"\t\tauto_bet: {self.auto_bet}\n"
                 f"\t\tcurrent_payout_multiplier: {self.current_payout_multiplier}\n")
 
     def get_bet_phase_str(self):
@@ -83,10 +105,16 @@ class BlackjackGame(BaseGame):
     """
     Blackjack game model class. Keeps track of the turn order and dealer's hand
     """
-    def __init__(self):
+    def __init__(self, simultaneous_turns=False, auto_rebet=False):
         # game state 1 -> accepting players but not playing yet
         super().__init__(game_type=1, player_data={}, game_state=1)
 
+        # players bet the same as last round when a new round starts
+        self.auto_rebet = auto_rebet
+        # every player takes their turn at the same time instead of in turn order
+        self.simultaneous_turns = simultaneous_turns
+        # players that haven't finished their turn in a simultaneous turn round
+        self.waiting_players = set()
         self.turn_order = []
         self.dealer_hand = []
         self.dealer_hidden_card = None
@@ -106,6 +134,9 @@ class BlackjackGame(BaseGame):
         ret += ("Blackjack game attributes:\n"
                 f"\tturn_order: {self.turn_order}\n"
                 f"\tturn_index: {self.turn_index}\n"
+                f"\tsimultaneous_turns: {self.simultaneous_turns}\n"
+                f"\tauto_rebet: {self.auto_rebet}\n"
+                f"\twaiting_players: {self.waiting_players}\n"
                 f"\tdealer_hand: {self.dealer_hand}\n"
                 f"\tdealer_hidden_card: {self.dealer_hidden_card}\n")
         ret += self.get_player_debug_strs()
@@ -124,10 +155,29 @@ class BlackjackGame(BaseGame):
 class BlackjackManager(GameManager):
     """
     Blackjack manager class
+
+    The play phase is driven by button events: at most one turn prompt
+    (turn_view on turn_message) is open at a time, its buttons call
+    take_turn_action, and every step returns as soon as the next prompt
+    is sent, so nothing waits on a view while the round goes on.
+
+    In simultaneous turn mode every player opens their own ephemeral hit
+    or stand buttons (private_views) at once, and the dealer plays when
+    the last one finishes or SIMULTANEOUS_TURN_SECONDS have passed.
     """
-    def __init__(self, factory, channel):
-        super().__init__(game=BlackjackGame(), base_gui=BlackjackButtonsBase(self),
-                         channel=channel, factory=factory)
+    def __init__(self, factory, channel, simultaneous_turns=False, auto_rebet=False):
+        super().__init__(game=BlackjackGame(simultaneous_turns, auto_rebet),
+                         base_gui=BlackjackButtonsBase(self), channel=channel, factory=factory)
+        # the hit or stand buttons for the current turn and the message they're on
+        self.turn_view = None
+        self.turn_message = None
+        # each player's own hit or stand buttons in a simultaneous turn round
+        self.private_views = {}
+        # the message everyone opens their buttons from, and the task ending the round
+        self.simultaneous_message = None
+        self.turn_deadline = None
+        # the task that deals once the automatic rebets can't be changed anymore
+        self.rebet_deadline = None
 
     async def add_player(self, interaction, init_player_data=None):
         await super().add_player(interaction, init_player_data)
@@ -159,6 +209,53 @@ class BlackjackManager(GameManager):
         await interaction.channel.send(f"{interaction.user.display_name} started the game!")
         self.base_gui = ButtonsBetPhase(self)
         await self.resend(interaction)
+        if self.game.auto_rebet:
+            await self.place_auto_rebets()
+
+    async def place_auto_rebets(self):
+        """
+        Bet every player's last bet again if they can still afford it,
+        in one message. These bets can be changed with any bet button
+        (or kept with "Same as Last") until AUTO_REBET_SECONDS have passed.
+        """
+        rebets = []
+        for player in self.game.turn_order:
+            player_data = self.game.player_data[player]
+            if player_data.current_bet == 0 and 0 < player_data.last_bet <= player_data.chips:
+                await self.place_bet(player, player_data.last_bet, announce=False)
+                player_data.auto_bet = True
+                rebets.append(f"{player.mention} ({player_data.last_bet})")
+        if not rebets:
+            return
+        await self.channel.send(f"Automatic rebets: {', '.join(rebets)}. Bet again within "
+                                f"{AUTO_REBET_SECONDS} seconds to change yours.")
+        self.rebet_deadline = asyncio.create_task(self.auto_rebet_deadline())
+
+    async def auto_rebet_deadline(self):
+        """
+        Keep every automatic rebet that wasn't changed once
+        AUTO_REBET_SECONDS have passed
+        """
+        await asyncio.sleep(AUTO_REBET_SECONDS)
+        self.rebet_deadline = None
+        if self.game.game_state != 4:
+            return
+        for player_data in self.game.player_data.values():
+            player_data.auto_bet = False
+        await self.deal_if_ready()
+
+    async def deal_if_ready(self):
+        """
+        Deal once every player has bet and no automatic rebet can still change
+        """
+        if self.game.players != self.game.betted_players:
+            return
+        if any(player_data.auto_bet for player_data in self.game.player_data.values()):
+            return
+        if self.rebet_deadline is not None:
+            self.rebet_deadline.cancel()
+            self.rebet_deadline = None
+        await self.deal_cards()
 
     async def start_new_round(self, interaction):
         """
@@ -169,6 +266,8 @@ class BlackjackManager(GameManager):
         self.game.dealer_hand.clear()
         self.game.dealer_hidden_card = None
         self.game.turn_index = -1
+        self.game.waiting_players.clear()
+        self.private_views.clear()
         self.game.game_state = 1
         self.game.betted_players = 0
         # allow players to join
@@ -216,53 +315,244 @@ class BlackjackManager(GameManager):
         if self.game.dealer_hidden_card is None:
             self.current_active_menu = await self.channel.send(self.get_base_menu_string(),
                                                                view=None, silent=True)
-            self.channel.send("Dealer got blackjack! House wins!")
+            await self.channel.send("Dealer got blackjack! House wins!")
             # move straight to payout phase
-            self.make_payout(21)
+            await self.make_payout(21)
         else:
             # otherwise initiate play phase
             self.base_gui = BlackjackButtonsBaseGame(self)
             self.current_active_menu = await self.channel.send(self.get_base_menu_string(),
                                                                view=self.base_gui, silent=True)
-            await self.start_next_player_turn()
+            if self.game.simultaneous_turns:
+                await self.start_simultaneous_turns()
+            else:
+                await self.start_next_player_turn()
 
     async def start_next_player_turn(self):
         """
-        Start the next player's turn
+        Start the next player's turn, skipping players that got
+        blackjack. Once every player has had their turn, the dealer
+        draws. Returns once the next player has been prompted, their
+        buttons carry on from take_turn_action.
         """
-        self.game.turn_index += 1
-        # if we made it to the end of the list, have the dealer go
-        if self.game.turn_index == self.game.players:
-            await self.channel.send("All players have had their turn, starting dealer draw!")
-            self.game.game_state = 6
-            await self.dealer_draw()
+        await self.close_turn_prompt()
+        while True:
+            self.game.turn_index += 1
+            # if we made it to the end of the list, have the dealer go
+            if self.game.turn_index == self.game.players:
+                self.game.game_state = 6
+                await self.dealer_draw()
+                return
+
+            # retrieving data
+            active_player = self.game.get_active_player()
+            active_player_data = self.game.player_data[active_player]
+            active_player_hand = active_player_data.hand
+
+            (eleven_aces, value) = bj_add(active_player_hand)
+            # if the player got a blackjack, skip their turn and give them
+            # a 2.5x payout immediately
+            if value == 21:
+                await self.channel.send(f"{active_player.mention} got blackjack! Moving on...")
+                active_player_data.current_payout_multiplier = 2.5
+                continue
+            active_player_data.hand_value = value
+            active_player_data.eleven_ace_count = eleven_aces
+            break
+
+        # initiate the hit or stand menu
+        await self.open_turn_prompt(active_player,
+                                    (f"{active_player.mention}, your turn! Your hand is\n"
+                                     f"{cards_to_str_52_standard(active_player_hand)}\n"
+                                     "What would you like to do?"))
+
+    async def open_turn_prompt(self, active_player, content):
+        """
+        Send the hit or stand buttons for active_player's turn
+        """
+        self.turn_view = HitOrStand(self, active_player)
+        self.turn_message = await self.channel.send(content, view=self.turn_view)
+
+    async def close_turn_prompt(self):
+        """
+        Remove the buttons from the current turn's message and let go
+        of its view, if there is one
+        """
+        turn_view = self.turn_view
+        turn_message = self.turn_message
+        self.turn_view = None
+        self.turn_message = None
+        if turn_view is not None:
+            turn_view.stop()
+        if turn_message is not None:
+            await turn_message.edit(view=None)
+
+    async def start_simultaneous_turns(self):
+        """
+        Start every player's turn at once. Players with blackjack are
+        done right away, everyone else opens their own buttons from the
+        message sent here. The dealer goes once they're all done, or
+        when the deadline passes.
+        """
+        for player in self.game.turn_order:
+            player_data = self.game.player_data[player]
+            (eleven_aces, value) = bj_add(player_data.hand)
+            if value == 21:
+                await self.channel.send(f"{player.mention} got blackjack!")
+                player_data.current_payout_multiplier = 2.5
+                continue
+            player_data.hand_value = value
+            player_data.eleven_ace_count = eleven_aces
+            self.game.waiting_players.add(player)
+        if not self.game.waiting_players:
+            await self.end_simultaneous_turns()
+            return
+        self.simultaneous_message = await self.channel.send(
+            (f"Everyone, it's your turn! Press the button to see your hand and play. "
+             f"The dealer goes in {SIMULTANEOUS_TURN_SECONDS} seconds or once "
+             "everyone is done."),
+            view=SimultaneousTurnButton(self))
+        self.turn_deadline = asyncio.create_task(self.simultaneous_turn_deadline())
+
+    async def open_private_turn(self, interaction):
+        """
+        Send a player their own hit or stand buttons for a simultaneous
+        turn round. Opening them again replaces the old ones.
+        """
+        player = interaction.user
+        if player not in self.game.waiting_players:
+            await send_info_message("You don't have a turn to take.", interaction)
             return
+        old_view = self.private_views.get(player)
+        if old_view is not None:
+            old_view.stop()
+        turn_view = HitOrStand(self, player)
+        self.private_views[player] = turn_view
+        player_data = self.game.player_data[player]
+        await interaction.response.send_message(
+            (f"Your hand is\n{cards_to_str_52_standard(player_data.hand)}\n"
+             "What would you like to do?"), view=turn_view, ephemeral=True)
+
+    async def take_private_action(self, interaction, turn_view, hit):
+        """
+        Handles a press of the hit or stand button on a player's own
+        buttons in a simultaneous turn round
+        """
+        player = turn_view.active_player
+        if interaction.user != player or self.private_views.get(player) is not turn_view:
+            await send_info_message("This turn is already over.", interaction)
+            return
+        if await self.game_end_check(interaction):
+            return
+        player_data = self.game.player_data[player]
+        if not hit:
+            content = f"You stand with {player_data.hand_value}."
+            announcement = f"{player.display_name} is standing!"
+        else:
+            new_card = self.hit_player(player)
+            content = (f"You drew {cards_to_str_52_standard([new_card])}! Your hand is now\n"
+                       f"{cards_to_str_52_standard(player_data.hand)}\n")
+            if player_data.hand_value > 21:
+                content += "That's a bust!"
+                announcement = f"{player.display_name} went bust!"
+            elif player_data.hand_value == 21:
+                content += "That's 21!"
+                announcement = f"{player.display_name} got 21!"
+            else:
+                content += f"which has a max value of {player_data.hand_value}! What next?"
+                await interaction.response.edit_message(content=content, view=turn_view)
+                return
+        # the player is done, let go of their buttons right away
+        turn_view.stop()
+        del self.private_views[player]
+        await interaction.response.edit_message(content=content, view=None)
+        await self.channel.send(announcement)
+        self.game.waiting_players.discard(player)
+        if not self.game.waiting_players:
+            await self.end_simultaneous_turns()
+
+    async def simultaneous_turn_deadline(self):
+        """
+        Make everyone that hasn't finished their turn stand once
+        SIMULTANEOUS_TURN_SECONDS have passed
+        """
+        await asyncio.sleep(SIMULTANEOUS_TURN_SECONDS)
+        if self.game.game_state != 5 or not self.game.waiting_players:
+            return
+        names = ", ".join(player.display_name for player in self.game.waiting_players)
+        await self.channel.send(f"Time's up! {names} will stand.")
+        self.game.waiting_players.clear()
+        await self.end_simultaneous_turns()
 
-        # retrieving data
-        active_player = self.game.get_active_player()
-        active_player_data = self.game.player_data[active_player]
-        active_player_hand = active_player_data.hand
-
-        (eleven_aces, value) = bj_add(active_player_hand)
-        # if the player got a blackjack, skip their turn and give them
-        # a 2.5x payout immediately
-        if value == 21:
-            await self.channel.send(f"{active_player.mention} got blackjack! Moving on...")
-            active_player_data.current_payout_multiplier = 2.5
-            await self.start_next_player_turn()
+    async def end_simultaneous_turns(self):
+        """
+        Close every player's buttons and have the dealer go
+        """
+        if self.game.game_state != 5:
             return
-        active_player_data.hand_value = value
-        active_player_data.eleven_ace_count = eleven_aces
+        self.game.game_state = 6
+        if self.turn_deadline is not None and self.turn_deadline is not asyncio.current_task():
+            self.turn_deadline.cancel()
+        self.turn_deadline = None
+        for turn_view in self.private_views.values():
+            turn_view.stop()
+        self.private_views.clear()
+        if self.simultaneous_message is not None:
+            await self.simultaneous_message.edit(view=None)
+            self.simultaneous_message = None
+        await self.dealer_draw()
+
+    def is_open_turn(self, turn_view):
+        """
+        Whether turn_view is the hit or stand buttons of a turn that
+        isn't over yet
+        """
+        if self.game.simultaneous_turns:
+            return self.private_views.get(turn_view.active_player) is turn_view
+        return turn_view is self.turn_view
 
-        # initiate the hit or stand menu
-        hit_me_view = HitOrStand(self, active_player)
-        active_msg = await self.channel.send((f"{active_player.mention}, your turn! Your hand is\n"
-                                        f"{cards_to_str_52_standard(active_player_hand)}\n"
-                                        "What would you like to do?"), view = hit_me_view)
-        # wait for the user to press hit or stand, then remove the
-        # buttons from the menu once they do
-        await hit_me_view.wait()
-        await active_msg.edit(view=None)
+    async def send_hint(self, interaction, turn_view):
+        """
+        Tells the active player whether hitting or standing has the
+        better expected value, looked up in the EV table
+        """
+        if not self.is_open_turn(turn_view) or interaction.user != turn_view.active_player:
+            await send_info_message("It's not your turn.", interaction)
+            return
+        player_data = self.game.player_data[interaction.user]
+        expected = hint_values(player_data.hand_value, player_data.eleven_ace_count > 0,
+                               self.game.dealer_hand[0].value)
+        if expected is None:
+            await send_info_message("Hints aren't available right now.", interaction)
+            return
+        best = max(expected, key=expected.get)
+        message = f"You should **{best}**.\nExpected return on your bet:"
+        for (action, value) in expected.items():
+            message += f"\n{action.capitalize()}: {value:+.2f}"
+        await interaction.response.send_message(message, ephemeral=True, delete_after=60)
+
+    async def take_turn_action(self, interaction, turn_view, hit):
+        """
+        Handles a press of the hit (hit is True) or stand button on
+        turn_view, ignoring buttons from turns that are already over
+        """
+        if self.game.simultaneous_turns:
+            await self.take_private_action(interaction, turn_view, hit)
+            return
+        if turn_view is not self.turn_view:
+            await send_info_message("This turn is already over.", interaction)
+            return
+        if interaction.user != turn_view.active_player:
+            await send_info_message("It's not your turn.", interaction)
+            return
+        # stop accepting interactions for this turn's message
+        await self.close_turn_prompt()
+        if hit:
+            await self.hit_user(interaction)
+        else:
+            await interaction.response.send_message(
+                f"{turn_view.active_player.display_name} is standing!")
+            await self.start_next_player_turn()
 
     def get_base_menu_string(self):
         if self.game.game_state == 1:
@@ -283,6 +573,8 @@ class BlackjackManager(GameManager):
             for player in self.game.turn_order:
                 player_data = self.game.player_data[player]
                 ret += f"\n{player.mention} {player_data.get_play_phase_str()}"
+                if player in self.game.waiting_players:
+                    ret += " (deciding...)"
             return ret
 
         return "You shouldn't be seeing this."
@@ -304,34 +596,14 @@ class BlackjackManager(GameManager):
         # so ensure that check is done before we get here
         active_player = interaction.user
         active_player_data = self.game.player_data[interaction.user]
-        new_card = STANDARD_52_DECK.draw(1)[0]
-        active_player_data.hand.append(new_card)
+        new_card = self.hit_player(active_player)
         response_message = f"{active_player.mention} drew {cards_to_str_52_standard([new_card])}! "
 
-        # manage add the card's value to the player's hand
-        if new_card.value == "A":
-            active_player_data.hand_value += 11
-            active_player_data.eleven_ace_count += 1
-        elif new_card.value in ("J", "Q", "K"):
-            active_player_data.hand_value += 10
-        else:
-            active_player_data.hand_value += int(new_card.value)
-
-        # reduce the value of any aces while the user is above 21,
-        # and if they are still above 21 when all aces are reduced,
-        # declare that they're gone bust
-        while active_player_data.hand_value > 21:
-            if active_player_data.eleven_ace_count > 0:
-                active_player_data.hand_value -= 10
-                active_player_data.eleven_ace_count -= 1
-            else:
-                # if the user busts, we set their payout to 0, which
-                # is never overwritten even if the dealer busts too
-                response_message += "That's a bust!"
-                active_player_data.current_payout_multiplier = 0
-                await interaction.response.send_message(response_message)
-                await self.start_next_player_turn()
-                return
+        if active_player_data.hand_value > 21:
+            response_message += "That's a bust!"
+            await interaction.response.send_message(response_message)
+            await self.start_next_player_turn()
+            return
 
         if active_player_data.hand_value == 21:
             response_message += "That's 21!"
@@ -344,15 +616,30 @@ class BlackjackManager(GameManager):
                              f"{cards_to_str_52_standard(active_player_data.hand)}, "
                              f"which has a max value of {active_player_data.hand_value}! ")
         response_message += "What next?"
-        hit_me_view = HitOrStand(self, active_player)
-        active_msg = await self.channel.send(response_message, view=hit_me_view)
-        # wait for the buttons to be pressed and remove once one has
-        await hit_me_view.wait()
-        await active_msg.edit(view=None)
+        await self.open_turn_prompt(active_player, response_message)
 
-    async def make_bet(self, interaction, bet_amount):
+    def hit_player(self, player):
+        """
+        Draws a card into a player's hand and returns it. Aces are
+        counted down to 1 while the player is above 21, and if they're
+        still above 21 they've gone bust.
         """
-        Set a player's bet
+        player_data = self.game.player_data[player]
+        new_card = STANDARD_52_DECK.draw(1)[0]
+        player_data.hand.append(new_card)
+        (player_data.hand_value, player_data.eleven_ace_count) = player_add(
+            player_data.hand_value, player_data.eleven_ace_count, new_card.value)
+        if player_data.hand_value > 21:
+            # if the user busts, we set their payout to 0, which
+            # is never overwritten even if the dealer busts too
+            player_data.current_payout_multiplier = 0
+        return new_card
+
+    async def make_bet(self, interaction, bet_amount, confirm=True):
+        """
+        Set a player's bet. Bets from the modal are confirmed with
+        double_check, the quick bet buttons pass confirm=False. A bet
+        replaces the player's automatic rebet, if they have one.
         """
         # checks to see if the game is over
         if await self.game_end_check(interaction):
@@ -361,78 +648,132 @@ class BlackjackManager(GameManager):
         # check to see if the user can bet, and deny them if not
         user = interaction.user
         user_data = self.game.player_data[user]
-        if user_data.current_bet != 0:
-            await send_info_message("You've already bet this round.", interaction)
-            return
-        if int(bet_amount) > user_data.chips:
-            await send_info_message("You cannot afford this bet.", interaction)
+        error = self.check_bet(user_data, int(bet_amount))
+        if error is not None:
+            await send_info_message(error, interaction)
             return
 
-        # double check to make sure the user wants to confirm this bet
-        (yes_clicked, interaction) = await double_check(interaction=interaction,
-                                                    message_content=f"Betting {str(bet_amount)}.")
-        if not yes_clicked:
-            await send_info_message("Cancelled bet!", interaction)
-            return
-        # perform the bet
-        user_data.current_bet = int(bet_amount)
-        user_data.chips -= int(bet_amount)
-        await interaction.channel.send((f"{user.mention} has bet {str(bet_amount)} "
-                                        f"chips and now has {str(user_data.chips)} "
-                                        "chips left!"))
-        self.game.betted_players += 1
-        if self.game.players == self.game.betted_players:
-            await self.deal_cards()
+        if confirm:
+            # nothing else can be bet while the player answers
+            user_data.bet_pending = True
+            try:
+                # double check to make sure the user wants to confirm this bet
+                (yes_clicked, interaction) = await double_check(
+                    interaction=interaction, message_content=f"Betting {str(bet_amount)}.")
+            finally:
+                user_data.bet_pending = False
+            if not yes_clicked:
+                await send_info_message("Cancelled bet!", interaction)
+                return
+            # the round may have moved on while they answered
+            if self.game.game_state != 4 or user not in self.game.player_data:
+                await send_info_message("Betting is over.", interaction)
+                return
+            error = self.check_bet(user_data, int(bet_amount))
+            if error is not None:
+                await send_info_message(error, interaction)
+                return
+        else:
+            await interaction.response.defer()
+        if user_data.auto_bet:
+            # give the automatic rebet back before placing the new bet
+            user_data.chips += user_data.current_bet
+            user_data.current_bet = 0
+            user_data.auto_bet = False
+            self.game.betted_players -= 1
+        await self.place_bet(user, int(bet_amount))
+        await self.deal_if_ready()
         return
 
+    def check_bet(self, user_data, bet_amount):
+        """
+        Returns why a player can't bet bet_amount, or None if they can.
+        Chips in an automatic rebet count as theirs since it gets refunded.
+        """
+        if user_data.bet_pending:
+            return "Answer your other bet first."
+        if user_data.current_bet != 0 and not user_data.auto_bet:
+            return "You've already bet this round."
+        chips = user_data.chips + (user_data.current_bet if user_data.auto_bet else 0)
+        if bet_amount > chips:
+            return "You cannot afford this bet."
+        return None
+
+    async def place_bet(self, user, bet_amount, announce=True):
+        """
+        Moves a player's bet out of their chips, checks are done by the caller
+        """
+        user_data = self.game.player_data[user]
+        user_data.current_bet = bet_amount
+        user_data.last_bet = bet_amount
+        user_data.chips -= bet_amount
+        if announce:
+            await self.channel.send((f"{user.mention} has bet {str(bet_amount)} "
+                                     f"chips and now has {str(user_data.chips)} "
+                                     "chips left!"))
+        self.game.betted_players += 1
+
+    async def quick_bet(self, interaction, bet_amount=None, rebet_multiplier=1):
+        """
+        Bet from one of the rebet or preset buttons, without a confirmation.
+        Without a bet_amount the last bet times rebet_multiplier is bet.
+        """
+        if not await self.deny_non_participants(interaction):
+            return
+        if bet_amount is None:
+            bet_amount = rebet_multiplier * self.game.player_data[interaction.user].last_bet
+        if bet_amount <= 0:
+            await send_info_message("You haven't made a bet to repeat yet.", interaction)
+            return
+        await self.make_bet(interaction, bet_amount, confirm=False)
+
     async def dealer_draw(self):
         """
-        Perform the dealer's play
+        Perform the dealer's play. The whole draw is shown in one
+        message that is edited as cards come in (at most once a second),
+        so a round takes the same few messages however many cards the
+        dealer draws.
         """
+        live_message = LiveMessage(self.channel)
+        lines = ["All players have had their turn, starting dealer draw!"]
         # reveal the dealer's hidden card if it hasn't been already
         # note: this check is probably worthless since the only case in
         # which it isn't hidden skips this phase
         if self.game.dealer_hidden_card is not None:
-            await self.channel.send((f"Dealer's hidden card is "
-                               f"{cards_to_str_52_standard([self.game.dealer_hidden_card])}!"))
+            lines.append((f"Dealer's hidden card is "
+                          f"{cards_to_str_52_standard([self.game.dealer_hidden_card])}!"))
             self.game.dealer_hand.append(self.game.dealer_hidden_card)
             self.game.dealer_hidden_card = None
 
         (_, hand_value) = bj_add(self.game.dealer_hand)
-        await self.channel.send((f"Dealer's hand is "
-                                    f"{cards_to_str_52_standard(self.game.dealer_hand)}, "
-                                    f"which has a total value of {hand_value}!"))
 
         # keep drawing until the deal exceeds 17 cards (bust or not)
         while hand_value < 17:
+            await live_message.set_content("\n".join(lines + [self.dealer_hand_str(hand_value)]))
             new_card = STANDARD_52_DECK.draw(1)
-            await self.channel.send(f"Dealer drew {cards_to_str_52_standard(new_card)}!")
+            lines.append(f"Dealer drew {cards_to_str_52_standard(new_card)}!")
             new_card = new_card[0]
             self.game.dealer_hand.append(new_card)
-            if new_card.value == "A":
-                # dealer always treats new aces as 11 unless doing so
-                # results in a bust
-                if hand_value + 11 > 21:
-                    hand_value += 1
-                else:
-                    hand_value += 11
-            elif new_card.value in ("J", "Q", "K"):
-                hand_value += 10
-            else:
-                hand_value += int(new_card.value)
-
-            await self.channel.send((f"Dealer's hand is "
-                                     f"{cards_to_str_52_standard(self.game.dealer_hand)}, "
-                                     f"which has a total value of {hand_value}!"))
+            hand_value = dealer_add(hand_value, new_card.value)
+        lines.append(self.dealer_hand_str(hand_value))
 
         # treat dealer's hand as 0 if it busts (so any non-busted
         # player is treated as winning)
         if hand_value > 21:
-            await self.channel.send("Dealer bust!")
+            lines.append("Dealer bust!")
             hand_value = 0
 
+        await live_message.set_content("\n".join(lines))
+        await live_message.flush()
         await self.make_payout(hand_value)
 
+    def dealer_hand_str(self, hand_value):
+        """
+        Describes the dealer's hand and its value
+        """
+        return (f"Dealer's hand is {cards_to_str_52_standard(self.game.dealer_hand)}, "
+                f"which has a total value of {hand_value}!")
+
     async def make_payout(self, dealer_hand_value):
         """
         Check through game player list, compare it to the dealer's hand
@@ -455,12 +796,10 @@ class BlackjackManager(GameManager):
 
         await self.channel.send(payout_str)
 
-        # then initiate the endgame phase
+        # then initiate the endgame phase, the buttons remove
+        # themselves once one is pressed
         self.game.game_state = 7
-        restart_ui = QuitGameButton(self)
-        active_msg = await self.channel.send("Play again?", view=restart_ui)
-        await restart_ui.wait()
-        await active_msg.edit(view=None)
+        await self.channel.send("Play again?", view=QuitGameButton(self))
 
 
 class QuitGameButton(discord.ui.View):
@@ -481,6 +820,7 @@ class QuitGameButton(discord.ui.View):
         print(f"{interaction.user} pressed {button.label}!")
         # stop accepting input
         self.stop()
+        await interaction.message.edit(view=None)
         await self.manager.start_new_round(interaction)
 
     @discord.ui.button(label = "End Game", style = discord.ButtonStyle.red)
@@ -493,6 +833,7 @@ class QuitGameButton(discord.ui.View):
         print(f"{interaction.user} pressed {button.label}!")
         # stop eccepting input
         self.stop()
+        await interaction.message.edit(view=None)
         await interaction.channel.send(f"{interaction.user.mention} ended the game!")
         await self.manager.quit_game(interaction)
 
@@ -594,12 +935,25 @@ class BetModal(discord.ui.Modal):
 
 class ButtonsBetPhase(discord.ui.View):
     """
-    Contains the "bet" button and also keeps track of players who have
-    placed bets
+    Contains the "bet" button, the rebet buttons and a button for each
+    of BET_PRESETS
     """
     def __init__(self, manager):
         super().__init__()
         self.manager = manager
+        for amount in BET_PRESETS:
+            preset = discord.ui.Button(label=f"Bet {amount}", style=discord.ButtonStyle.gray)
+            preset.callback = self.make_preset_callback(amount)
+            self.add_item(preset)
+
+    def make_preset_callback(self, amount):
+        """
+        Returns a button callback that bets amount
+        """
+        async def preset_bet(interaction: discord.Interaction):
+            print(f"{interaction.user} pressed Bet {amount}!")
+            await self.manager.quick_bet(interaction, amount)
+        return preset_bet
 
     @discord.ui.button(label = "Bet!", style = discord.ButtonStyle.green)
     async def bet(self, interaction: discord.Interaction, button: discord.ui.Button):
@@ -611,12 +965,46 @@ class ButtonsBetPhase(discord.ui.View):
             return
         await interaction.response.send_modal(BetModal(self.manager))
 
+    @discord.ui.button(label = "Same as Last", style = discord.ButtonStyle.blurple)
+    async def same_bet(self, interaction: discord.Interaction, button: discord.ui.Button):
+        """
+        Bet the same as last round
+        """
+        print(f"{interaction.user} pressed {button.label}!")
+        await self.manager.quick_bet(interaction)
+
+    @discord.ui.button(label = "Double", style = discord.ButtonStyle.blurple)
+    async def double_bet(self, interaction: discord.Interaction, button: discord.ui.Button):
+        """
+        Bet double what was bet last round
+        """
+        print(f"{interaction.user} pressed {button.label}!")
+        await self.manager.quick_bet(interaction, rebet_multiplier=2)
+
+
+class SimultaneousTurnButton(discord.ui.View):
+    """
+    Lets every player open their own hit or stand buttons in a
+    simultaneous turn round
+    """
+    def __init__(self, manager):
+        super().__init__(timeout=SIMULTANEOUS_TURN_SECONDS)
+        self.manager = manager
+
+    @discord.ui.button(label = "Take My Turn", style = discord.ButtonStyle.green)
+    async def take_turn(self, interaction: discord.Interaction, button: discord.ui.Button):
+        """
+        Send the player their own hit or stand buttons
+        """
+        print(f"{interaction.user} pressed {button.label}!")
+        await self.manager.open_private_turn(interaction)
+
 
 class HitOrStand(discord.ui.View):
     """
     Contains the "hit" and "stand" buttons when it's a certain player's
-    turn. Keeps track of which player's turn it is and denies input
-    to other players
+    turn. Keeps track of which player's turn it is, the manager denies
+    input to other players and to views of turns that are over
     """
     def __init__(self, manager, active_player):
         super().__init__()
@@ -626,30 +1014,26 @@ class HitOrStand(discord.ui.View):
     @discord.ui.button(label = "Hit Me!", style = discord.ButtonStyle.green)
     async def hit_me(self, interaction: discord.Interaction, button: discord.ui.Button):
         """
-        Check if the interaction is valid, and if so, call hit_user
+        Give the active player another card
         """
         print(f"{interaction.user} pressed {button.label}!")
-        if interaction.user != self.active_player:
-            await send_info_message("It's not your turn.", interaction)
-            return
-        # stop accepting interactions for this message
-        self.stop()
-        await self.manager.hit_user(interaction)
+        await self.manager.take_turn_action(interaction, self, True)
 
     @discord.ui.button(label = "Stand", style = discord.ButtonStyle.blurple)
     async def stand(self, interaction: discord.Interaction, button: discord.ui.Button):
         """
-        Check if the interaction is valid, and if so, make the user stand
-        and start the next player's turn
+        Make the active player stand and start the next player's turn
         """
-        if interaction.user != self.active_player:
-            await send_info_message("It's not your turn.", interaction)
-            return
         print(f"{interaction.user} pressed {button.label}!")
-        await interaction.response.send_message(f"{self.active_player.display_name} is standing!")
-        # stop accepting interactions for this message
-        self.stop()
-        await self.manager.start_next_player_turn()
+        await self.manager.take_turn_action(interaction, self, False)
+
+    @discord.ui.button(label = "Hint", style = discord.ButtonStyle.gray)
+    async def hint(self, interaction: discord.Interaction, button: discord.ui.Button):
+        """
+        Show the active player the best move for their hand
+        """
+        print(f"{interaction.user} pressed {button.label}!")
+        await self.manager.send_hint(interaction, self)
 
 
 def bj_add(cards):
@@ -677,3 +1061,230 @@ def bj_add(cards):
         else:
             break
     return (ret_ace_count, total)
+
+
+def dealer_add(hand_value, card_value):
+    """
+    Adds a card the dealer drew to its hand value. The dealer always
+    treats new aces as 11 unless doing so results in a bust, and never
+    counts an ace down to 1 afterwards.
+    """
+    if card_value == "A":
+        if hand_value + 11 > 21:
+            return hand_value + 1
+        return hand_value + 11
+    if card_value in ("J", "Q", "K"):
+        return hand_value + 10
+    return hand_value + int(card_value)
+
+
+# card values in the order used for shoe compositions
+BJ_RANKS = ('A', '2', '3', '4', '5', '6', '7', '8', '9', '10', 'J', 'Q', 'K')
+# the games deal from STANDARD_52_DECK, which is one of every card
+STANDARD_COMPOSITION = (4,) * 13
+# dealer outcomes in the order they're returned, 0 means bust
+DEALER_OUTCOMES = (17, 18, 19, 20, 21, 0)
+
+
+def shoe_composition(cards):
+    """
+    Counts a list of Card objects into a composition (a tuple with the
+    amount of each value in BJ_RANKS)
+    """
+    counts = [0] * len(BJ_RANKS)
+    for card in cards:
+        counts[BJ_RANKS.index(card.value)] += 1
+    return tuple(counts)
+
+
+def dealer_outcome_probabilities(up_card_value, composition=STANDARD_COMPOSITION,
+                                 replacement=True, peeked=False):
+    """
+    Returns the exact probability of the dealer finishing on 17, 18,
+    19, 20, 21 and bust (in that order, see DEALER_OUTCOMES) given its
+    up card value (e.g. "A" or "10"), playing the way dealer_draw does:
+    the two first cards are added up with bj_add, then it draws until
+    it has 17 or more using dealer_add.
+
+    composition is the amount of each card value (in BJ_RANKS order)
+    that the hidden card and draws come from. STANDARD_52_DECK draws with
+    replacement, so by default the composition never changes. With
+    replacement=False every card drawn is taken out of the shoe (take
+    the up card out of composition first).
+
+    With peeked=True the probabilities are given that the dealer didn't
+    get blackjack, which deal_cards checks before anyone plays.
+
+    Results are cached per up card and composition, so asking again is free.
+    """
+    return _dealer_outcomes(up_card_value, tuple(composition), replacement, peeked)
+
+
+@lru_cache(maxsize=4096)
+def _dealer_outcomes(up_card_value, composition, replacement, peeked):
+    """
+    Cached body of dealer_outcome_probabilities
+    """
+    up_card = BJ_RANKS.index(up_card_value)
+    outcomes = [0.0] * len(DEALER_OUTCOMES)
+    total = sum(composition)
+    skipped = 0.0
+    for (hidden, count) in enumerate(composition):
+        if count == 0:
+            continue
+        chance = count / total
+        hidden_value = BJ_RANKS[hidden]
+        # the same check deal_cards uses for the dealer's blackjack
+        if peeked and (up_card_value == "A" and hidden_value in ("J", "Q", "K")
+                       or hidden_value == "A" and up_card_value in ("J", "Q", "K")):
+            skipped += chance
+            continue
+        (_, hand_value) = _bj_add_values((up_card, hidden))
+        shoe = composition if replacement else _take_card(composition, hidden)
+        for (index, probability) in enumerate(_dealer_draw_outcomes(hand_value, shoe,
+                                                                    replacement)):
+            outcomes[index] += chance * probability
+    if skipped:
+        outcomes = [probability / (1 - skipped) for probability in outcomes]
+    return tuple(outcomes)
+
+
+@lru_cache(maxsize=65536)
+def _dealer_draw_outcomes(hand_value, composition, replacement):
+    """
+    Probabilities of each dealer outcome from hand_value (after the
+    two first cards) when drawing from composition
+    """
+    if hand_value > 21:
+        return (0.0, 0.0, 0.0, 0.0, 0.0, 1.0)
+    if hand_value >= 17:
+        outcome = [0.0] * len(DEALER_OUTCOMES)
+        outcome[hand_value - 17] = 1.0
+        return tuple(outcome)
+    outcomes = [0.0] * len(DEALER_OUTCOMES)
+    total = sum(composition)
+    for (rank, count) in enumerate(composition):
+        if count == 0:
+            continue
+        chance = count / total
+        shoe = composition if replacement else _take_card(composition, rank)
+        next_outcomes = _dealer_draw_outcomes(dealer_add(hand_value, BJ_RANKS[rank]), shoe,
+                                              replacement)
+        for (index, probability) in enumerate(next_outcomes):
+            outcomes[index] += chance * probability
+    return tuple(outcomes)
+
+
+def _take_card(composition, rank):
+    """
+    Returns composition with one card of rank taken out
+    """
+    return composition[:rank] + (composition[rank] - 1,) + composition[rank + 1:]
+
+
+def _bj_add_values(ranks):
+    """
+    bj_add for indexes into BJ_RANKS instead of Card objects
+    """
+    return bj_add([Card("", BJ_RANKS[rank]) for rank in ranks])
+
+
+# expected value table of each move, see build_ev_table
+EV_TABLE_PATH = "configs/blackjack_ev.npy"
+# moves in the order of the table's last axis
+EV_ACTIONS = ("stand", "hit")
+# dealer up card values in the order of the table's third axis. J, Q
+# and K aren't the same as 10 here, the dealer has already shown it
+# doesn't have an ace under them
+EV_UP_CARDS = BJ_RANKS
+
+
+def player_add(hand_value, eleven_ace_count, card_value):
+    """
+    Adds a card to a player's hand the way hit_user does, counting aces
+    down to 1 while the hand is over 21. Returns the new
+    (hand_value, eleven_ace_count).
+    """
+    if card_value == "A":
+        hand_value += 11
+        eleven_ace_count += 1
+    elif card_value in ("J", "Q", "K"):
+        hand_value += 10
+    else:
+        hand_value += int(card_value)
+    while hand_value > 21 and eleven_ace_count > 0:
+        hand_value -= 10
+        eleven_ace_count -= 1
+    return (hand_value, eleven_ace_count)
+
+
+def build_ev_table(path=EV_TABLE_PATH):
+    """
+    Works out the expected return on a 1 chip bet of standing and
+    hitting (then playing on perfectly) for every player hand value,
+    soft or hard hand and dealer up card, and saves it to path as a
+    (2, 22, len(EV_UP_CARDS), len(EV_ACTIONS)) float32 array indexed
+    by [soft, hand value, up card, move].
+
+    Uses the game's rules: the dealer plays like dealer_draw and has
+    already been checked for blackjack, a win pays the bet again, a bust
+    loses even if the dealer busts too, and reaching 21 ends the turn.
+    The cards come from STANDARD_COMPOSITION with replacement.
+    """
+    table = np.full((2, 22, len(EV_UP_CARDS), len(EV_ACTIONS)), np.nan, dtype=np.float32)
+    total = sum(STANDARD_COMPOSITION)
+    draws = [(BJ_RANKS[rank], count / total)
+             for (rank, count) in enumerate(STANDARD_COMPOSITION) if count]
+    for (up_index, up_card_value) in enumerate(EV_UP_CARDS):
+        dealer = dealer_outcome_probabilities(up_card_value, peeked=True)
+
+        def stand(hand_value):
+            # the dealer's bust outcome counts as 0, like in make_payout
+            return sum(probability * ((hand_value > outcome) - (hand_value < outcome))
+                       for (outcome, probability) in zip(DEALER_OUTCOMES, dealer))
+
+        @lru_cache(maxsize=None)
+        def hit(hand_value, eleven_ace_count):
+            expected = 0.0
+            for (card_value, probability) in draws:
+                (new_value, new_aces) = player_add(hand_value, eleven_ace_count, card_value)
+                if new_value > 21:
+                    expected -= probability
+                elif new_value == 21:
+                    expected += probability * stand(21)
+                else:
+                    expected += probability * max(stand(new_value), hit(new_value, new_aces))
+            return expected
+
+        for soft in (0, 1):
+            # a soft hand has an ace counted as 11, so it's worth at least 12
+            for hand_value in range(12 if soft else 4, 22):
+                table[soft, hand_value, up_index] = (stand(hand_value),
+                                                     hit(hand_value, soft))
+    np.save(path, table)
+    return table
+
+
+def _load_ev_table(path=EV_TABLE_PATH):
+    """
+    Loads the EV table, it's small enough to keep in memory
+    """
+    try:
+        return np.load(path)
+    except FileNotFoundError:
+        logging.warning("Blackjack EV table %s not found, run build_tables.py", path)
+        return None
+
+
+EV_TABLE = _load_ev_table()
+
+
+def hint_values(hand_value, soft, up_card_value):
+    """
+    Returns a dict of the expected return on the bet of each move for
+    a player hand, or None if the EV table isn't available
+    """
+    if EV_TABLE is None or not 4 <= hand_value <= 21:
+        return None
+    row = EV_TABLE[int(soft), hand_value, EV_UP_CARDS.index(up_card_value)]
+    return {action: float(value) for (action, value) in zip(EV_ACTIONS, row)}
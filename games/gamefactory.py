@@ -18,9 +18,11 @@ class GameFactory():
     def __init__(self):
         self.active_games = {}
 
-    async def start_game(self, interaction, game_type, cpus=0):
+    async def start_game(self, interaction, game_type, cpus=0, simultaneous_turns=False,
+                         auto_rebet=False):
         """
-        Starts a game specified by the ID of game_type.
+        Starts a game specified by the ID of game_type. simultaneous_turns
+        and auto_rebet only apply to blackjack.
 
         ID Key:
         ----
@@ -45,7 +47,8 @@ class GameFactory():
 
         elif game_type == 1:
             logging.info("New blackjack game created in channel: [%i]", interaction.channel_id)
-            new_game = BlackjackManager(self, interaction.channel)
+            new_game = BlackjackManager(self, interaction.channel, simultaneous_turns,
+                                        auto_rebet)
             self.active_games[interaction.channel_id] = new_game
             await new_game.create_game(interaction)
 
@@ -57,7 +60,7 @@ class GameFactory():
 
         elif game_type == 3:
             logging.info("New uno game created in channel: [%i]", interaction.channel_id)
-            new_game = UnoManager(self, interaction.channel)
+            new_game = UnoManager(self, interaction.channel, cpus)
             self.active_games[interaction.channel_id] = new_game
             await new_game.create_game(interaction)
 
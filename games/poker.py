@@ -4,18 +4,36 @@ Contains all the logic needed to run a game of Texas Hold'em Poker.
 It features an closed game model, meaning not all users can interact
 with the game at any time, and there is player management.
 """
+import asyncio
+import atexit
+import itertools
+import logging
+import logging.handlers
+import os
+import queue
 import random
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 from itertools import combinations
+from itertools import permutations
 import discord
+import numpy as np
 from games.game import BaseGame
 from games.game import GameManager
 from games.game import BasePlayer
+from util import Card
+from util import CpuUser
 from util import double_check
-from util import STANDARD_52_DECK
 from util import cards_to_str_52_standard
 from util import send_info_message
 from util import generate_deck
 
+# chips the first two players after the button have to bet every hand
+SMALL_BLIND = 50
+BIG_BLIND = 100
+
+
 class PokerPlayer(BasePlayer):
     """
     Represents a player in a game of poker.
@@ -27,6 +45,7 @@ class PokerPlayer(BasePlayer):
     4. total_bet (int): The total amount of chips the player has bet.
     5. is_cpu (bool): Specifies whether the player is controlled by the CPU.
     6. active (bool): Specifies whether the player is active in the game.
+    7. strength (HandStrength): The player's best hand so far, updated as cards are dealt.
     Methods:
     1. get_debug_str: Returns a string representation of the player's debug information.
     """
@@ -45,6 +64,7 @@ class PokerPlayer(BasePlayer):
         self.total_bet = 0
         self.is_cpu = is_cpu
         self.active = True #Inactive when they fold
+        self.strength = None
 
     def get_debug_str(self):
         """
@@ -57,7 +77,230 @@ class PokerPlayer(BasePlayer):
                 f"\t\tchips: {self.chips}\n"
                 f"\t\tround_bet: {self.round_bet}\n"
                 f"\t\ttotal_bet: {self.total_bet}\n"
-                f"\t\tactive: {self.active}\n")
+                f"\t\tactive: {self.active}\n"
+                f"\t\tstrength: {self.strength}\n")
+
+class BettingRound():
+    """
+    Keeps track of the betting in a hand: whose turn it is, the largest
+    bet and minimum raise of the current street, and how many players
+    still owe an action before the street is over.
+    Players that can still bet (haven't folded or gone all in) sit in a
+    ring of next/prev links, so folding and going all in don't need to
+    search a list, and the players that still have to act are counted as
+    bets come in, so is_street_over doesn't need to look at every player.
+    Attributes:
+    1. seat_order (list): Every player dealt into the hand, in turn order.
+    2. contenders (int): Players that haven't folded.
+    3. acting (int): Players that can still bet.
+    4. to_act (int): Players that still have to act before the street is over.
+    5. largest_bet (int): The largest bet in the current street.
+    6. min_raise (int): The smallest amount a raise has to add to the largest bet.
+    7. current (user): The player whose turn it is, None if nobody can bet.
+    8. raise_closed (set): Players that acted since the last full raise. An all in
+       short of a full raise doesn't reopen raising for them, they can only call or fold.
+    Methods:
+    1. start_street: Resets the bets for a new street.
+    2. post_blinds: Makes the first two players bet the blinds.
+    3. to_call: Returns how much a player has to bet to call (capped at their chips).
+    4. check_bet: Returns why a bet isn't allowed, or None if it is.
+    5. bet: Applies a bet (call, raise or all in) and moves the turn on.
+    6. fold: Takes a player out of the hand and moves the turn on.
+    7. is_street_over: Whether every player has acted on the current bet.
+    8. can_raise: Whether a player is allowed to raise.
+    9. get_debug_str: Returns a string representation of the round's debug information.
+    """
+    def __init__(self, seat_order, player_data, min_bet=1):
+        self.player_data = player_data
+        self.seat_order = list(seat_order)
+        self.seat_index = {player: index for (index, player) in enumerate(self.seat_order)}
+        self.min_bet = min_bet
+        self.contenders = len(self.seat_order)
+        # players without chips are all in from the start
+        can_bet = [player for player in self.seat_order if player_data[player].chips > 0]
+        self.acting = len(can_bet)
+        self.next_seat = {}
+        self.prev_seat = {}
+        for (index, player) in enumerate(can_bet):
+            self.next_seat[player] = can_bet[(index + 1) % len(can_bet)]
+            self.prev_seat[player] = can_bet[index - 1]
+        self.first = can_bet[0] if can_bet else None
+        self.largest_bet = 0
+        self.min_raise = min_bet
+        self.to_act = 0
+        self.current = None
+        self.raise_closed = set()
+        self.start_street()
+
+    def start_street(self):
+        """
+        Resets the bets for a new street, the first player in the seat
+        order that can bet starts (heads up it's the other player, the
+        small blind has the button and acts last)
+        """
+        for player in self.seat_order:
+            self.player_data[player].round_bet = 0
+        self.largest_bet = 0
+        self.min_raise = self.min_bet
+        self.raise_closed.clear()
+        # a player can't bet against nobody
+        self.to_act = self.acting if self.acting > 1 else 0
+        self.current = self.first if self.to_act > 0 else None
+        if self.current is not None and len(self.seat_order) == 2:
+            self.current = self.next_seat[self.first]
+
+    def post_blinds(self, small_blind, big_blind):
+        """
+        Makes the first two players that can bet post the small and big
+        blind (or all of their chips if they have less), the player
+        after the big blind starts. Returns a list of (player, amount)
+        for the blinds that were posted.
+        """
+        if self.acting < 2:
+            return []
+        self.min_bet = big_blind
+        self.min_raise = big_blind
+        small = self.first
+        big = self.next_seat[small]
+        posted = []
+        for (player, blind) in ((small, small_blind), (big, big_blind)):
+            player_data = self.player_data[player]
+            amount = min(blind, player_data.chips)
+            player_data.round_bet += amount
+            player_data.total_bet += amount
+            player_data.chips -= amount
+            posted.append((player, amount))
+        self.largest_bet = max(self.player_data[small].round_bet, self.player_data[big].round_bet)
+        # a blind is a forced bet, so everyone (the big blind too) still gets to act
+        starter = self.next_seat[big]
+        for player in (small, big):
+            if self.player_data[player].chips == 0:
+                if starter is player:
+                    starter = self.next_seat[player]
+                self._unlink(player)
+        if self.acting > 1:
+            self.to_act = self.acting
+        else:
+            # only one player can bet, they just have to decide on calling
+            self.to_act = sum(self.player_data[player].round_bet < self.largest_bet
+                              for player in self.next_seat)
+        self.current = starter if self.to_act > 0 and self.acting > 0 else None
+        return posted
+
+    def to_call(self, player):
+        """
+        Returns how many chips a player has to bet to call, if they
+        don't have that many it's all of their chips
+        """
+        player_data = self.player_data[player]
+        return min(self.largest_bet - player_data.round_bet, player_data.chips)
+
+    def can_raise(self, player):
+        """
+        Whether a player may raise, which they can't if they already
+        acted and have only been raised by an all in short of a full raise
+        """
+        return player not in self.raise_closed
+
+    def check_bet(self, player, amount):
+        """
+        Returns a message saying why a player can't bet amount, or None
+        if the bet is allowed
+        """
+        player_data = self.player_data[player]
+        owed = self.largest_bet - player_data.round_bet
+        if amount < 0:
+            return "You cannot bet a negative amount."
+        if amount > player_data.chips:
+            return "You cannot afford this bet."
+        if amount > owed and not self.can_raise(player):
+            return "The last raise was short of a full raise, you can only call or fold."
+        # going all in is always allowed
+        if amount == player_data.chips:
+            return None
+        if amount < owed:
+            return f"You need to bet at least {owed} chips to call."
+        if owed < amount < owed + self.min_raise:
+            return f"A raise has to be at least {self.min_raise} chips more than the call."
+        return None
+
+    def bet(self, player, amount):
+        """
+        Moves amount of a player's chips into their bets (the caller
+        checks it with check_bet first) and moves the turn on
+        """
+        player_data = self.player_data[player]
+        player_data.round_bet += amount
+        player_data.total_bet += amount
+        player_data.chips -= amount
+        raised_by = player_data.round_bet - self.largest_bet
+        if raised_by >= self.min_raise:
+            # a full raise lets everyone that already acted raise again
+            self.raise_closed.clear()
+        self.raise_closed.add(player)
+        if raised_by > 0:
+            # a short all in raise doesn't change the minimum raise
+            self.min_raise = max(self.min_raise, raised_by)
+            self.largest_bet = player_data.round_bet
+            # everyone else that can still bet has to answer the raise
+            self.to_act = self.acting - 1
+        else:
+            self.to_act -= 1
+        self._leave_turn(player, player_data.chips == 0)
+
+    def fold(self, player):
+        """
+        Takes a player out of the hand and moves the turn on
+        """
+        self.player_data[player].active = False
+        self.contenders -= 1
+        self.to_act -= 1
+        self._leave_turn(player, True)
+
+    def _leave_turn(self, player, out_of_ring):
+        """
+        Moves the turn to the next player, taking player out of the ring
+        of players that can bet if they folded or went all in
+        """
+        following = self.next_seat[player]
+        if out_of_ring:
+            if following is player:
+                following = None
+            self._unlink(player)
+        self.current = None if self.is_street_over() else following
+
+    def _unlink(self, player):
+        """
+        Takes a player out of the ring of players that can bet
+        """
+        self.acting -= 1
+        following = self.next_seat.pop(player)
+        before = self.prev_seat.pop(player)
+        if following is player:
+            self.first = None
+            return
+        self.next_seat[before] = following
+        self.prev_seat[following] = before
+        if self.first is player:
+            self.first = following
+
+    def is_street_over(self):
+        """
+        Whether every player has acted on the current bet
+        """
+        return self.to_act <= 0 or self.contenders <= 1
+
+    def get_debug_str(self):
+        """
+        Returns a string representation of the betting round's debug information.
+        """
+        return (f"\tcurrent: {self.current}\n"
+                f"\tcontenders: {self.contenders}\n"
+                f"\tacting: {self.acting}\n"
+                f"\tto_act: {self.to_act}\n"
+                f"\tlargest_bet: {self.largest_bet}\n"
+                f"\tmin_raise: {self.min_raise}\n"
+                f"\traise_closed: {self.raise_closed}\n")
 
 class PokerGame(BaseGame):
     """
@@ -67,28 +310,44 @@ class PokerGame(BaseGame):
     1. deck (list): The deck of cards.
     2. community_cards (list): The community cards.
     3. pool (int): The number of chips in the pool.
-    4. largest_bet (int): The largest bet in the current round.
-    5. turn_order (list): The order of players in the game.
-    6. active_player_turn_order (list): The order of active players in the game.
-    7. turn_index (int): The index of the current player in the turn order.
-    8. best_hand (list): The best hand in the game.
-    9. winner (dict): The winner of the game.
+    4. turn_order (list): The order of players in the game.
+    5. betting (BettingRound): The betting in the current hand, None between hands.
+    6. payouts (dict): The chips each player won at the end of the round.
+    7. table_name (str): Names the table in the hand history.
+    8. history (HandHistory): The history of the current hand, None if it isn't recorded.
     Methods:
     1. get_debug_str: Returns a string representation of the game's debug information.
-    2. get_player_debug_strs: Returns a string representation of player data for debugging purposes.
+    2. draw_cards: Deals cards from the top of the deck.
+    3. start_hand: Deals every player in and posts the blinds.
+    4. bet: Makes the current player bet (call, raise or all in).
+    5. fold: Makes the current player fold.
+    6. deal_street: Deals the flop, turn or river and starts its betting.
+    7. is_hand_over: Whether the hand is ready for the showdown.
+    8. settle: Pays out the pots.
+    9. reset_hand: Clears the hand and moves the button.
+    10. get_player_debug_strs: Returns a string representation of player data for debugging purposes.
+
+    The hand itself (everything from start_hand to settle) doesn't need
+    discord, so it can also be played by the simulator in
+    benchmarks/poker_sim.py.
     """
-    def __init__(self, cpus):
+    def __init__(self, cpus, record_history=True):
         # game state 1 -> accepting players but not playing yet
+        cpus = min(max(cpus, 0), MAX_CPUS)
         super().__init__(game_type=1, player_data={}, game_state=1, cpus=cpus)
+        # computer players take their seats right away and stay for every round
+        for number in range(1, cpus + 1):
+            cpu = CpuUser(number)
+            self.player_data[cpu] = PokerPlayer(is_cpu=True)
         self.deck = generate_deck()
         self.community_cards = []
         self.pool = 0
-        self.largest_bet = 0
-        self.turn_order = []
-        self.active_player_turn_order = []
-        self.turn_index = 0
-        self.best_hand = []
-        self.winner = {}
+        self.turn_order = list(self.player_data)
+        self.betting = None
+        self.payouts = {}
+        self.table_name = "headless"
+        self.record_history = record_history
+        self.history = None
         random.shuffle(self.deck)
 
     def get_debug_str(self):
@@ -96,13 +355,127 @@ class PokerGame(BaseGame):
         ret += ("Poker game attributes:\n"
                 f"\tcommunity: {self.community_cards}\n"
                 f"\tpool: {self.pool}\n"
-                f"\tlargest_bet: {self.largest_bet}\n"
                 f"\tturn_order: {self.turn_order}\n"
-                f"\tactive_turn_order: {self.active_player_turn_order}\n"
                 )
+        if self.betting is not None:
+            ret += "Betting round:\n" + self.betting.get_debug_str()
         ret += self.get_player_debug_strs()
         return ret
 
+    def draw_cards(self, count):
+        """
+        Removes count cards from the top of the shuffled deck and
+        returns them as a list
+        """
+        return [self.deck.pop() for _ in range(count)]
+
+    def start_hand(self):
+        """
+        Deals two cards to every player, starts the betting and posts
+        the blinds. Returns the blinds as a list of (player, amount).
+        """
+        for player in self.turn_order:
+            player_data = self.player_data[player]
+            player_data.hand.extend(self.draw_cards(2))
+            player_data.strength = HandStrength(player_data.hand)
+        if self.record_history:
+            self.history = HandHistory(self.table_name, self.turn_order, self.player_data)
+        self.betting = BettingRound(self.turn_order, self.player_data)
+        blinds = self.betting.post_blinds(SMALL_BLIND, BIG_BLIND)
+        self.pool += sum(amount for (_, amount) in blinds)
+        if self.history is not None:
+            self.history.record_blinds(blinds, self.player_data)
+        return blinds
+
+    def bet(self, player, amount):
+        """
+        Moves amount of a player's chips into the pool (the caller
+        checks it with betting.check_bet first)
+        """
+        largest_bet = self.betting.largest_bet
+        self.betting.bet(player, amount)
+        self.pool += amount
+        if self.history is not None:
+            self.history.record_bet(player, amount, largest_bet, self.player_data[player])
+
+    def fold(self, player):
+        """
+        Takes a player out of the hand
+        """
+        self.betting.fold(player)
+        if self.history is not None:
+            self.history.record_fold(player)
+
+    def deal_street(self):
+        """
+        Deals the flop (or the turn or river if the flop is out) and
+        starts a new street of betting. Returns the new cards.
+        """
+        if len(self.community_cards) == 0:
+            new_cards = self.draw_cards(3)
+        else:
+            new_cards = self.draw_cards(1)
+        self.community_cards.extend(new_cards)
+        if self.history is not None:
+            self.history.record_street(self.community_cards, len(new_cards))
+        # only the new cards need to be added to each player's hand strength
+        for player in self.turn_order:
+            player_data = self.player_data[player]
+            if player_data.active:
+                for card in new_cards:
+                    player_data.strength.add(card)
+        self.betting.start_street()
+        return new_cards
+
+    def is_hand_over(self):
+        """
+        Whether the betting on the current street is over and there's
+        nothing left to deal (or only one player is left)
+        """
+        return self.betting.is_street_over() and (self.betting.contenders <= 1
+                                                  or len(self.community_cards) == 5)
+
+    def settle(self):
+        """
+        Splits the pool between the players that haven't folded and
+        adds their winnings to their chips. Returns the payouts.
+        """
+        contenders = [player for player in self.turn_order if self.player_data[player].active]
+        if len(contenders) != 0:
+            # hands were scored as the cards were dealt, so there's nothing to evaluate
+            scores = {player: self.player_data[player].strength.score for player in contenders}
+            bets = {player: self.player_data[player].total_bet for player in self.turn_order}
+            self.payouts = split_pots(bets, scores, self.turn_order)
+            for (player, amount) in self.payouts.items():
+                self.player_data[player].chips += amount
+            if self.history is not None:
+                self.history.record_showdown(contenders, self.player_data, self.payouts,
+                                             self.community_cards)
+                write_hand_history(self.history)
+                self.history = None
+            self.pool = 0
+        return self.payouts
+
+    def reset_hand(self):
+        """
+        Clears the cards and bets of the last hand and moves the button
+        one seat, so the blinds go around the table
+        """
+        for player in self.turn_order:
+            self.player_data[player].hand = []
+            self.player_data[player].round_bet = 0
+            self.player_data[player].total_bet = 0
+            self.player_data[player].active = True
+            self.player_data[player].strength = None
+        self.deck = generate_deck()
+        self.community_cards = []
+        self.pool = 0
+        self.betting = None
+        self.payouts = {}
+        random.shuffle(self.deck)
+        if self.turn_order:
+            self.turn_order.append(self.turn_order.pop(0))
+
     def get_player_debug_strs(self):
         """
         Returns a string representation of the player data for debugging purposes.
@@ -130,14 +503,22 @@ class PokerManager(GameManager):
     4. start_new_round: Starts a new round.
     5. deal_cards: Deals cards to the players.
     6. make_bet: Makes a bet.
-    7. deal_table: Deals cards to the table.
-    8. finalize_game: Finalizes the game.
-    9. get_base_menu_string: Returns a string representation of the base menu.
-    10. get_debug_str: Returns a string representation of the manager's debug information.
+    7. place_bet: Moves a player's chips into the pool.
+    8. fold_player: Takes a player out of the round.
+    9. next_player: Moves on to the next street or the showdown once the betting allows it.
+    10. run_cpu_turns: Lets the CPU players act until it's a human's turn.
+    11. show_all_in_equity: Shows every hand's chances before an all in run out.
+    12. deal_table: Deals cards to the table.
+    13. finalize_game: Finalizes the game.
+    14. get_base_menu_string: Returns a string representation of the base menu.
+    15. get_debug_str: Returns a string representation of the manager's debug information.
     """
     def __init__(self, factory, channel, cpus):
         super().__init__(game=PokerGame(cpus), base_gui=PokerButtonsBase(self),
                          channel=channel, factory=factory)
+        self.game.table_name = str(channel.id)
+        # set while the CPU players are acting so their turns aren't run twice
+        self.cpus_acting = False
 
     async def add_player(self, interaction, init_player_data=None):
         """
@@ -169,42 +550,24 @@ class PokerManager(GameManager):
             return
         # game_state == 4 -> players cannot join or leave
         self.game.game_state = 4
-        for player in self.game.turn_order:
-            self.game.active_player_turn_order.append(player)
 
         # swap default GUI to betting phase buttons
         await interaction.channel.send(f"{interaction.user.display_name} started the game!")
         await self.deal_cards(interaction)
         await self.resend(interaction)
+        # the blinds can put everyone but one player all in before anyone acts
+        await self.next_player(interaction)
+        await self.run_cpu_turns(interaction)
 
     async def start_new_round(self, interaction):
         """
         Reset the game state to player join phase
         """
         self.game.game_state = 1
-        active = False
-        if len(self.game.active_player_turn_order) != 0:
-            active = True
-
-        for player in self.game.turn_order:
-            self.game.player_data[player].hand = []
-            self.game.player_data[player].round_bet = 0
-            self.game.player_data[player].total_bet = 0
-            self.game.player_data[player].active = True
-
-        self.game.deck = generate_deck()
-        self.game.community_cards = []
-        self.game.pool = 0
-        self.game.largest_bet = 0
-        self.game.active_player_turn_order = []
-        self.game.turn_index = 0
-        self.game.best_hand = []
-        self.game.winner = {}
-        random.shuffle(self.game.deck)
+        self.game.reset_hand()
         # allow players to join
         self.base_gui = PokerButtonsBase(self)
-        if not active:
-            await self.resend(interaction)
+        await self.resend(interaction)
 
     async def deal_cards(self, interaction):
         """
@@ -217,10 +580,8 @@ class PokerManager(GameManager):
         self.game.game_state = 5
 
         await interaction.channel.send("Dealing cards...")
-
-        # draw 2 cards for every player
-        for i in self.game.player_data:
-            self.game.player_data[i].hand.extend(STANDARD_52_DECK.draw(2))
+        for (player, amount) in self.game.start_hand():
+            await self.channel.send(f"{player.mention} posts a blind of {amount} chips.")
 
         self.base_gui = ButtonsBetPhase(self)
 
@@ -234,14 +595,14 @@ class PokerManager(GameManager):
 
         # check to see if it is the user's turn
         user = interaction.user
-        if self.game.active_player_turn_order[self.game.turn_index] != user:
+        if self.game.betting is None or self.game.betting.current != user:
             await send_info_message("This is not your turn yet.", interaction)
             return
 
         # check to see if the user can bet, and deny them if not
-        user_data = self.game.player_data[user]
-        if int(bet_amount) > user_data.chips:
-            await send_info_message("You cannot afford this bet.", interaction)
+        bet_error = self.game.betting.check_bet(user, int(bet_amount))
+        if bet_error is not None:
+            await send_info_message(bet_error, interaction)
             return
 
         # double check to make sure the user wants to confirm this bet
@@ -250,31 +611,104 @@ class PokerManager(GameManager):
         if not yes_clicked:
             await send_info_message("Cancelled bet!", interaction)
             return
-        # perform the bet
-        user_data.round_bet += int(bet_amount)
-        user_data.total_bet += int(bet_amount)
-        self.game.pool += int(bet_amount)
-        user_data.chips -= int(bet_amount)
-        if user_data.round_bet >= self.game.largest_bet:
-            self.game.largest_bet = user_data.round_bet
-        await interaction.channel.send((f"{user.mention} has bet {str(bet_amount)} "
-                                        f"chips and now has {str(user_data.chips)} "
-                                        "chips left!"))
-        await self.base_gui.next_player(interaction, False)
+        await self.place_bet(interaction, user, int(bet_amount))
+        await self.run_cpu_turns(interaction)
         return
 
-    async def deal_table(self, interaction):
+    async def place_bet(self, interaction, user, bet_amount):
         """
-        Deal cards to the table
+        Moves bet_amount of a player's chips into the pool and moves on
+        to the next player. Checks are done by the caller.
         """
-        self.game.largest_bet = 0
-        if len(self.game.community_cards) == 0:
-            self.game.community_cards.extend(STANDARD_52_DECK.draw(3))
-
-        elif len(self.game.community_cards) == 5:
-            await self.finalize_game(interaction)
+        user_data = self.game.player_data[user]
+        self.game.bet(user, bet_amount)
+        if user_data.chips == 0:
+            await self.channel.send(f"{user.mention} is all in with {str(bet_amount)} chips!")
         else:
-            self.game.community_cards.extend(STANDARD_52_DECK.draw(1))
+            await self.channel.send((f"{user.mention} has bet {str(bet_amount)} "
+                                     f"chips and now has {str(user_data.chips)} "
+                                     "chips left!"))
+        await self.next_player(interaction)
+
+    async def fold_player(self, interaction, user):
+        """
+        Takes a player out of the round and moves on to the next player
+        """
+        self.game.fold(user)
+        await self.channel.send(f"{user.mention} has folded!")
+        await self.next_player(interaction)
+
+    async def next_player(self, interaction):
+        """
+        Once every player has acted on the current bet, the manager
+        deals the next street, or goes to the showdown after the river or
+        when there's only one player left. When fewer than two players
+        can still bet, the rest of the board is dealt without betting.
+        """
+        equity_shown = False
+        while self.game.betting.is_street_over():
+            if self.game.is_hand_over():
+                await self.finalize_game(interaction)
+                return
+            if self.game.betting.acting < 2 and not equity_shown:
+                await self.show_all_in_equity()
+                equity_shown = True
+            if self.game.game_state == 5:
+                self.game.game_state = 6
+            await self.deal_table(interaction)
+
+    async def run_cpu_turns(self, interaction):
+        """
+        While it's a CPU player's turn in the betting phase, let it
+        decide what to do (off the event loop, see decide_cpu_action)
+        and act. Called after every human action, and returns once it's
+        a human's turn again.
+        """
+        if self.cpus_acting:
+            return
+        self.cpus_acting = True
+        try:
+            while self.game.game_state in (5, 6) and self.game.betting.current is not None:
+                betting = self.game.betting
+                cpu = betting.current
+                cpu_data = self.game.player_data[cpu]
+                if not cpu_data.is_cpu:
+                    break
+                to_call = betting.to_call(cpu)
+                bet_amount = await decide_cpu_action(
+                    cpu_data.hand, self.game.community_cards, betting.contenders - 1,
+                    to_call, betting.min_raise, self.game.pool, cpu_data.chips,
+                    betting.seat_index[cpu], len(betting.seat_order))
+                if bet_amount > to_call and not betting.can_raise(cpu):
+                    bet_amount = to_call
+                self.quick_log(f"{cpu} decided to bet {bet_amount} ({to_call} to call)")
+                if bet_amount < 0:
+                    await self.fold_player(interaction, cpu)
+                else:
+                    await self.place_bet(interaction, cpu, bet_amount)
+        finally:
+            self.cpus_acting = False
+
+    async def show_all_in_equity(self):
+        """
+        Turns over the hands that are left when the rest of the board
+        is dealt without betting, with the chance each one has to win
+        """
+        contenders = [player for player in self.game.turn_order
+                      if self.game.player_data[player].active]
+        hands = [self.game.player_data[player].hand for player in contenders]
+        equity = await calculate_equity_async(hands, self.game.community_cards)
+        ret = "All in! The rest of the board is dealt without betting:\n"
+        for (player, hand, (win, tie, _)) in zip(contenders, hands, equity):
+            ret += (f"{player.display_name}: {cards_to_str_52_standard(hand)} "
+                    f"wins {win:.1f}%, ties {tie:.1f}%\n")
+        await self.channel.send(ret)
+
+    async def deal_table(self, interaction):
+        """
+        Deal cards to the table and start a new street of betting
+        """
+        self.game.deal_street()
         await self.resend(interaction)
         return
 
@@ -285,20 +719,7 @@ class PokerManager(GameManager):
         self.game.game_state = 7
         self.base_gui = None
 
-        if len(self.game.active_player_turn_order) != 0:
-            winning_hand = []
-            for player in self.game.player_data:
-                if not winning_hand:
-                    winning_hand = self.game.player_data[player].hand
-                    self.game.winner = player.display_name
-                    self.game.best_hand = winning_hand
-                else:
-                    b_1 = best_hand(winning_hand, self.game.community_cards)
-                    b_2 = best_hand(self.game.player_data[player].hand, self.game.community_cards)
-                    if b_1 < b_2:
-                        winning_hand = self.game.player_data[player].hand
-                        self.game.winner = player.display_name
-                        self.game.best_hand = winning_hand
+        if self.game.settle():
             await self.resend(interaction)
 
         restart_ui = QuitGameButton(self)
@@ -323,34 +744,37 @@ class PokerManager(GameManager):
 
         if self.game.game_state == 5:
             ret = "Largest bet:\n"
-            ret += f"{self.game.largest_bet}\n"
+            ret += f"{self.game.betting.largest_bet}\n"
             ret += "Pool:\n"
             ret += f"{self.game.pool}\n"
-            who_turn = self.game.active_player_turn_order[self.game.turn_index].mention
-            ret += f"It's {who_turn}'s turn to bet!\n"
+            if self.game.betting.current is not None:
+                ret += f"It's {self.game.betting.current.mention}'s turn to bet!\n"
             return ret
 
         if self.game.game_state == 6:
             ret = "Community cards:\n"
             ret += f"{cards_to_str_52_standard(self.game.community_cards)}\n"
             ret += "Largest bet:\n"
-            ret += f"{self.game.largest_bet}\n"
+            ret += f"{self.game.betting.largest_bet}\n"
             ret += "Pool:\n"
             ret += f"{self.game.pool}\n"
             return ret
 
         if self.game.game_state == 7:
-            ret = f"{self.game.winner} has WON!\n"
-            ret += "Winning hand:\n"
-            ret += f"{cards_to_str_52_standard(self.game.best_hand)}\n"
-            if len(self.game.active_player_turn_order) <= 0:
-                ret = ""
+            ret = ""
+            for (player, amount) in self.game.payouts.items():
+                if amount > 0:
+                    player_data = self.game.player_data[player]
+                    ret += (f"{player.display_name} has WON {amount} chips with "
+                            f"{cards_to_str_52_standard(player_data.hand)} "
+                            f"({player_data.strength.describe()})!\n")
             return ret
 
         return "You shouldn't be seeing this."
 
     def get_debug_str(self):
-        return super().get_debug_str() + self.game.get_debug_str()
+        return (super().get_debug_str() + self.game.get_debug_str()
+                + EQUITY_CACHE.get_debug_str())
 
 
 class PokerButtonsBase(discord.ui.View):
@@ -429,7 +853,7 @@ class BetModal(discord.ui.Modal):
 
     # apparently you just kind of put this down and it works
     bet_box = discord.ui.TextInput(label="How much do you want to bet?",
-                                   max_length=4,
+                                   max_length=7,
                                    placeholder="Enter bet here...")
 
     async def on_submit(self, interaction: discord.Interaction):
@@ -455,32 +879,6 @@ class ButtonsBetPhase(discord.ui.View):
         super().__init__()
         self.manager = manager
 
-    async def next_player(self, interaction: discord.Interaction, folded):
-        """
-        Add a player to the bet count, once all players have bet,
-        the manager moves to the dealing phase
-        """
-        if not folded:
-            self.manager.game.turn_index += 1
-        if self.manager.game.turn_index >= len(self.manager.game.active_player_turn_order):
-            self.manager.game.turn_index = 0
-            if len(self.manager.game.active_player_turn_order) == 0:
-                await self.manager.finalize_game(interaction)
-            else:
-                bet_set = True
-                for player in self.manager.game.player_data:
-                    if self.manager.game.player_data[player].active \
-                    and (self.manager.game.player_data[player].round_bet !=
-                        self.manager.game.largest_bet):
-                        bet_set = False
-                if bet_set:
-                    if self.manager.game.game_state == 5:
-                        self.manager.game.game_state = 6
-                    for player in self.manager.game.turn_order:
-                        self.manager.game.player_data[player].round_bet = 0
-                    await self.manager.deal_table(interaction)
-
-
     @discord.ui.button(label = "View Hand", style = discord.ButtonStyle.blurple)
     async def hit_me(self, interaction: discord.Interaction, button: discord.ui.Button):
         """
@@ -491,7 +889,8 @@ class ButtonsBetPhase(discord.ui.View):
         current_player = self.manager.game.player_data[interaction.user]
         if len(current_player.hand) != 2:
             raise ValueError("Player hand must contain 2 cards")
-        message = f"Your hand is {cards_to_str_52_standard(current_player.hand)}"
+        message = (f"Your hand is {cards_to_str_52_standard(current_player.hand)}\n"
+                   f"You have {current_player.strength.describe()}")
         await interaction.response.send_message(message, ephemeral = True, delete_after = 60)
 
     @discord.ui.button(label = "Call", style = discord.ButtonStyle.green)
@@ -500,8 +899,13 @@ class ButtonsBetPhase(discord.ui.View):
         Call
         """
         print(f"{interaction.user} pressed {button.label}!")
-        await self.manager.make_bet(interaction, self.manager.game.largest_bet
-            - self.manager.game.player_data[interaction.user].round_bet)
+        if self.manager.game.betting is None \
+        or interaction.user not in self.manager.game.betting.seat_index:
+            await send_info_message("You are not in this hand.", interaction)
+            return
+        # calling with fewer chips than the bet puts the player all in
+        await self.manager.make_bet(interaction,
+                                    self.manager.game.betting.to_call(interaction.user))
 
     @discord.ui.button(label = "Raise", style = discord.ButtonStyle.red)
     async def bet(self, interaction: discord.Interaction, button: discord.ui.Button):
@@ -513,6 +917,19 @@ class ButtonsBetPhase(discord.ui.View):
             return
         await interaction.response.send_modal(BetModal(self.manager))
 
+    @discord.ui.button(label = "All In", style = discord.ButtonStyle.red)
+    async def all_in(self, interaction: discord.Interaction, button: discord.ui.Button):
+        """
+        Bet every chip the player has
+        """
+        print(f"{interaction.user} pressed {button.label}!")
+        if self.manager.game.betting is None \
+        or interaction.user not in self.manager.game.betting.seat_index:
+            await send_info_message("You are not in this hand.", interaction)
+            return
+        await self.manager.make_bet(interaction,
+                                    self.manager.game.player_data[interaction.user].chips)
+
     @discord.ui.button(label = "Fold", style = discord.ButtonStyle.gray)
     async def fold(self, interaction: discord.Interaction, button: discord.ui.Button):
         """
@@ -520,11 +937,13 @@ class ButtonsBetPhase(discord.ui.View):
         """
         print(f"{interaction.user} pressed {button.label}!")
         #Fold
-        self.manager.game.player_data[interaction.user].active = False
-        self.manager.game.active_player_turn_order.remove(interaction.user)
-        self.manager.base_gui = None
-        await interaction.response.send_message(f"{interaction.user.mention} has folded!")
-        await self.next_player(interaction, True)
+        if self.manager.game.betting is None \
+        or self.manager.game.betting.current != interaction.user:
+            await send_info_message("This is not your turn yet.", interaction)
+            return
+        await interaction.response.send_message("You folded.", ephemeral=True, delete_after=10)
+        await self.manager.fold_player(interaction, interaction.user)
+        await self.manager.run_cpu_turns(interaction)
 
 
 class QuitGameButton(discord.ui.View):
@@ -583,8 +1002,7 @@ def max_hand(hand):
     along with information necessary for breaking ties
     hand: list of 5 Card objects
     """
-    lookup = ("2", "3", "4", "5", "6", "7", "8", "9", "10", "J","Q", "K", "A")
-    alt_lookup = ("A",) + lookup[:12] #Used in checking Straight Flush and Straights for A=1
+    lookup = RANKS
     if len(hand) != 5:
         raise ValueError("Hand must contain 5 cards")
     hand.sort(key = lambda x: lookup.index(x.value))
@@ -594,6 +1012,13 @@ def max_hand(hand):
             same_suit = False
             break
     highest_value = lookup.index(hand[4].value)
+    #A low straight (A=1) sorts as 2,3,4,5,A, so it can't be found by checking neighbors
+    is_low_straight = [c.value for c in hand] == ["2", "3", "4", "5", "A"]
+    is_high_straight = True
+    for index in range(4):
+        if lookup.index(hand[index].value) + 1 != lookup.index(hand[index + 1].value):
+            is_high_straight = False
+            break
 
     #Check Royal Flush
     if same_suit:
@@ -603,14 +1028,10 @@ def max_hand(hand):
 
     #Check Straight Flush
     if same_suit:
-        #Straight Flush uses alt_lookup because if it is not a Royal Flush, A=1 if it is a Flush
-        is_straight = True
-        for index in range(4):
-            if alt_lookup.index(hand[index].value) + 1 != alt_lookup.index(hand[index + 1].value):
-                is_straight = False
-                break
-        if is_straight:
+        if is_high_straight:
             return encode_hand_value((9, highest_value))
+        if is_low_straight:
+            return encode_hand_value((9, 3))
 
     type_dict = dict()
     for c in hand:
@@ -636,16 +1057,6 @@ def max_hand(hand):
         + tuple(sorted([lookup.index(c.value) for c in hand], reverse = True)))
 
     #Check Straight
-    is_high_straight = True
-    for index in range(4):
-        if lookup.index(hand[index].value) + 1 != lookup.index(hand[index + 1].value):
-            is_high_straight = False
-            break
-    is_low_straight = True
-    for index in range(4):
-        if alt_lookup.index(hand[index].value) + 1 != alt_lookup.index(hand[index + 1].value):
-            is_low_straight = False
-            break
     if is_high_straight:
         return encode_hand_value((5, highest_value))
     if is_low_straight:
@@ -656,11 +1067,9 @@ def max_hand(hand):
     #Check Three of a Kind
     for key in type_dict:
         if type_dict[key] == 3:
-            for key2 in type_dict:
-                if key2 != key:
-                    for key3 in type_dict:
-                        if key3 != key and key3 != key2:
-                            return encode_hand_value((4, lookup.index(key), lookup.index(key2), lookup.index(key3)))
+            kicker_values = [lookup.index(key2) for key2 in type_dict if key2 != key]
+            return encode_hand_value((4, lookup.index(key))
+            + tuple(sorted(kicker_values, reverse = True)))
 
     #Check Two Pair
     num_pairs = 0
@@ -705,6 +1114,61 @@ def compare_hands(hand1, hand2):
         return 2
     return 0
 
+def split_pots(bets, scores, seat_order):
+    """
+    Splits the chips that were bet between the winners.
+    bets: the total chips each player put in this round, folded or not
+    scores: hand value of each player still in the round
+    seat_order: list of players, odd chips of a split go to the first ones
+    Returns a dict with the chips won by every player in scores.
+
+    Hands are ranked with a single sort. Players who bet less than
+    others (all in) can only win a side pot up to their own bet, and
+    players with the same hand value split each pot they share.
+    Everything is sorted once and each pot is found by walking forward,
+    so apart from the sorts the cost grows linearly with the players.
+    """
+    seat_position = {player: index for (index, player) in enumerate(seat_order)}
+    # best hand first, and players with the same hand by bet from largest
+    # to smallest, so the ones still eligible for a pot come first
+    ranked = sorted(scores, key=lambda player: (scores[player], bets[player]), reverse=True)
+    payouts = {player: 0 for player in scores}
+    # every distinct bet of a player still in the round caps a pot
+    levels = sorted({bets[player] for player in scores})
+    all_bets = sorted(bets.values())
+    # all_bets[:counted] are at most the current level and add up to counted_sum,
+    # every other bet only adds the level itself to a pot capped at that level
+    counted = 0
+    counted_sum = 0
+    # chips under the previous level, which earlier pots already took
+    taken = 0
+    # ranked[:top] bet less than the current level, so they can't win it
+    top = 0
+    for (index, level) in enumerate(levels):
+        if index == len(levels) - 1:
+            # the last pot also takes anything folded players bet over it
+            capped = sum(all_bets)
+        else:
+            while counted < len(all_bets) and all_bets[counted] <= level:
+                counted_sum += all_bets[counted]
+                counted += 1
+            capped = counted_sum + (len(all_bets) - counted) * level
+        pot = capped - taken
+        taken = capped
+        while bets[ranked[top]] < level:
+            top += 1
+        # eligible players with the same value are next to each other in ranked
+        end = top + 1
+        while end < len(ranked) and scores[ranked[end]] == scores[ranked[top]] \
+        and bets[ranked[end]] >= level:
+            end += 1
+        winners = sorted(ranked[top:end], key=seat_position.get)
+        (share, odd_chips) = divmod(pot, len(winners))
+        for (position, player) in enumerate(winners):
+            payouts[player] += share + (1 if position < odd_chips else 0)
+    return payouts
+
+
 def best_hand(user_hand, table):
     """
     This finds the best value using 0-2 of the user_hand
@@ -715,12 +1179,926 @@ def best_hand(user_hand, table):
     if len(table) > 5 or len(table) < 3:
         raise ValueError("Table must contain 3-5 cards")
 
-    #During the flop, the card combination is 5 choose 5, so one possible hand per-person
-    #During the turn, the card combination is 6 choose 5, so 6 possible hands per-person
-    #During the river, the card combination is 7 choose 5, so 21 possible hands per-person
-    #Technically, river phase can be sped up here because if a user's best hand is just
-    #the five on the table, then they are not winning, they draw at best. Can change if it is slow.
-    all_cards = user_hand + table
-    card_combinations = list(combinations(all_cards, 5)) # Thank you FoCS for this knowledge :)
-    best_value = max([max_hand(list(c)) for c in card_combinations])
-    return best_value
+    #Rather than scoring every 5 card combination with max_hand, all of the cards are
+    #scored at once with the lookup tables below, which give the same values
+    return evaluate_hand([card_to_id(c) for c in user_hand + table])
+
+
+         #######################################################
+      ####                                                     ####
+    ###                   HAND EVALUATOR TABLES                   ###
+      ####                                                     ####
+         #######################################################
+
+# Cards are given integer ids so that they can be used to index the
+# tables: card id = rank * 4 + suit, where rank is the index of the
+# card's value in RANKS and suit is the index of its name in SUITS
+RANKS = ("2", "3", "4", "5", "6", "7", "8", "9", "10", "J", "Q", "K", "A")
+SUITS = ("D", "H", "S", "C")
+_CARD_IDS = {(suit, value): rank * 4 + suit_index
+             for (rank, value) in enumerate(RANKS)
+             for (suit_index, suit) in enumerate(SUITS)}
+
+
+def card_to_id(card):
+    """
+    Returns the integer id (0-51) of a standard 52 deck Card
+    """
+    return _CARD_IDS[(card.name, card.value)]
+
+
+def id_to_card(card_id):
+    """
+    Returns a new Card object for a card id
+    """
+    return Card(SUITS[card_id & 3], RANKS[card_id >> 2])
+
+
+def _straight_high(rank_mask):
+    """
+    Returns the rank of the highest card of the best straight found
+    in a 13 bit mask of ranks, or -1 if there is none
+    """
+    for high in range(12, 3, -1):
+        window = 0b11111 << (high - 4)
+        if rank_mask & window == window:
+            return high
+    # A,2,3,4,5 counts as a straight with 5 as its highest card
+    if rank_mask & 0b1000000001111 == 0b1000000001111:
+        return 3
+    return -1
+
+
+def _score_rank_counts(counts):
+    """
+    Returns the value of the best hand that can be made from a
+    multiset of ranks (counts[r] cards of rank r) when no flush is
+    possible, encoded the same way as max_hand
+    """
+    ranks = []
+    pairs = []
+    trips = []
+    quad = -1
+    rank_mask = 0
+    for rank in range(12, -1, -1):
+        count = counts[rank]
+        if count:
+            ranks.append(rank)
+            rank_mask |= 1 << rank
+            if count >= 2:
+                pairs.append(rank)
+            if count >= 3:
+                trips.append(rank)
+            if count == 4:
+                quad = rank
+
+    if quad >= 0:
+        kickers = [r for r in ranks if r != quad]
+        return encode_hand_value((8, quad) + tuple(kickers[:1]))
+
+    if trips:
+        fill = [r for r in pairs if r != trips[0]]
+        if fill:
+            return encode_hand_value((7, trips[0], fill[0]))
+
+    high = _STRAIGHT_HIGHS[rank_mask]
+    if high >= 0:
+        return encode_hand_value((5, high))
+
+    if trips:
+        kickers = [r for r in ranks if r != trips[0]]
+        return encode_hand_value((4, trips[0]) + tuple(kickers[:2]))
+
+    if len(pairs) >= 2:
+        kickers = [r for r in ranks if r not in pairs[:2]]
+        return encode_hand_value((3, pairs[0], pairs[1]) + tuple(kickers[:1]))
+
+    if pairs:
+        kickers = [r for r in ranks if r != pairs[0]]
+        return encode_hand_value((2, pairs[0]) + tuple(kickers[:3]))
+
+    return encode_hand_value((1, ) + tuple(ranks[:5]))
+
+
+def _score_flush_mask(rank_mask):
+    """
+    Returns the value of the best hand that can be made from a mask
+    of at least 5 ranks that all share a suit
+    """
+    high = _STRAIGHT_HIGHS[rank_mask]
+    if high == 12:
+        return encode_hand_value((10, 12))
+    if high >= 0:
+        return encode_hand_value((9, high))
+    ranks = [r for r in range(12, -1, -1) if rank_mask & (1 << r)]
+    return encode_hand_value((6, ) + tuple(ranks[:5]))
+
+
+def _build_rank_table():
+    """
+    Scores every multiset of 1-7 ranks (no rank more than 4 times).
+    The table is keyed by the sum of _RANK_KEYS over the cards, which
+    gives each rank its own 3 bit counter.
+    """
+    table = {}
+    counts = [0] * 13
+
+    def fill(rank, cards_left, key):
+        if rank == 13:
+            if cards_left < 7:
+                table[key] = _score_rank_counts(counts)
+            return
+        fill(rank + 1, cards_left, key)
+        for count in range(1, min(4, cards_left) + 1):
+            counts[rank] = count
+            fill(rank + 1, cards_left - count, key + (count << (3 * rank)))
+        counts[rank] = 0
+
+    fill(0, 7, 0)
+    return table
+
+
+# adding _RANK_KEYS (or _SUIT_KEYS) over a set of cards counts how many
+# of each rank (or suit) there are in it, 3 bits per counter
+_RANK_KEYS = tuple(1 << (3 * (card_id >> 2)) for card_id in range(52))
+_SUIT_KEYS = tuple(1 << (3 * (card_id & 3)) for card_id in range(52))
+_RANK_BITS = tuple(1 << (card_id >> 2) for card_id in range(52))
+# highest card of the best straight for every 13 bit mask of ranks
+_STRAIGHT_HIGHS = tuple(_straight_high(mask) for mask in range(1 << 13))
+# which suit (if any) has 5 or more cards for every possible _SUIT_KEYS sum
+_FLUSH_SUITS = tuple(next((s for s in range(4) if (key >> (3 * s)) & 7 >= 5), -1)
+                     for key in range(1 << 12))
+# value of the best hand for every mask of 5 or more suited ranks
+_FLUSH_TABLE = tuple(_score_flush_mask(mask) if bin(mask).count("1") >= 5 else 0
+                     for mask in range(1 << 13))
+# value of the best non-flush hand for every multiset of ranks
+_RANK_TABLE = _build_rank_table()
+
+
+def evaluate_hand(card_ids):
+    """
+    Returns the value of the best 5 card hand that can be made from
+    5-7 card ids. The value is the same as the highest max_hand value
+    among all of the 5 card combinations, but it only takes a couple
+    of table lookups instead of up to 21 calls to max_hand.
+    """
+    rank_key = 0
+    suit_key = 0
+    for card_id in card_ids:
+        rank_key += _RANK_KEYS[card_id]
+        suit_key += _SUIT_KEYS[card_id]
+    flush_suit = _FLUSH_SUITS[suit_key]
+    if flush_suit < 0:
+        return _RANK_TABLE[rank_key]
+    # with at most 7 cards a flush always beats whatever the other
+    # ranks could have made, so only the suited ranks matter
+    rank_mask = 0
+    for card_id in card_ids:
+        if card_id & 3 == flush_suit:
+            rank_mask |= _RANK_BITS[card_id]
+    return _FLUSH_TABLE[rank_mask]
+
+
+RANK_NAMES = ("2", "3", "4", "5", "6", "7", "8", "9", "10", "Jack", "Queen", "King", "Ace")
+HAND_CATEGORIES = ("High Card", "Pair", "Two Pair", "Three of a Kind", "Straight",
+                   "Flush", "Full House", "Four of a Kind", "Straight Flush", "Royal Flush")
+
+
+def describe_hand_value(value):
+    """
+    Turns a hand value into a readable name, such as
+    "Two Pair, Kings and 7s"
+    """
+    category = value // (13**5)
+    # the ranks that encode_hand_value packed after the category
+    ranks = [(value // (13 ** (4 - index))) % 13 for index in range(5)]
+    (first, second) = (RANK_NAMES[ranks[0]], RANK_NAMES[ranks[1]])
+    if category == 1:
+        return f"{first} High"
+    if category == 2:
+        return f"Pair of {first}s"
+    if category == 3:
+        return f"Two Pair, {first}s and {second}s"
+    if category == 4:
+        return f"Three of a Kind, {first}s"
+    if category == 5:
+        return f"Straight, {first} High"
+    if category == 6:
+        return f"Flush, {first} High"
+    if category == 7:
+        return f"Full House, {first}s full of {second}s"
+    if category == 8:
+        return f"Four of a Kind, {first}s"
+    if category == 9:
+        return f"Straight Flush, {first} High"
+    return "Royal Flush"
+
+
+class HandStrength():
+    """
+    Running score of the best hand in a growing set of cards. Keeps the
+    same counters that evaluate_hand adds up, so adding the next card
+    of the board is a couple of table lookups instead of scoring every
+    card again.
+    """
+    def __init__(self, cards=()):
+        self.rank_key = 0
+        self.suit_key = 0
+        self.suit_masks = [0, 0, 0, 0]
+        self.score = 0
+        for card in cards:
+            self.add(card)
+
+    def add(self, card):
+        """
+        Adds a Card and updates the score
+        """
+        card_id = card_to_id(card)
+        self.rank_key += _RANK_KEYS[card_id]
+        self.suit_key += _SUIT_KEYS[card_id]
+        self.suit_masks[card_id & 3] |= _RANK_BITS[card_id]
+        flush_suit = _FLUSH_SUITS[self.suit_key]
+        if flush_suit < 0:
+            self.score = _RANK_TABLE[self.rank_key]
+        else:
+            self.score = _FLUSH_TABLE[self.suit_masks[flush_suit]]
+
+    def category(self):
+        """
+        Returns the index of the hand's category in HAND_CATEGORIES
+        """
+        return self.score // (13**5) - 1
+
+    def describe(self):
+        """
+        Returns the readable name of the hand
+        """
+        return describe_hand_value(self.score)
+
+    def __repr__(self):
+        return f"<score={self.score} hand={self.describe()}>"
+
+
+# numpy copies of the tables for evaluate_hands. The rank table is
+# stored as sorted key and value arrays so that it can be searched
+# for a whole batch at once.
+_RANK_KEYS_NP = np.array(_RANK_KEYS, dtype=np.int64)
+_SUIT_KEYS_NP = np.array(_SUIT_KEYS, dtype=np.int64)
+_RANK_BITS_NP = np.array(_RANK_BITS, dtype=np.int64)
+_FLUSH_SUITS_NP = np.array(_FLUSH_SUITS, dtype=np.int8)
+_FLUSH_TABLE_NP = np.array(_FLUSH_TABLE, dtype=np.int32)
+_RANK_TABLE_KEYS_NP = np.array(sorted(_RANK_TABLE), dtype=np.int64)
+_RANK_TABLE_VALUES_NP = np.array([_RANK_TABLE[key] for key in sorted(_RANK_TABLE)],
+                                 dtype=np.int32)
+
+
+def evaluate_hands(card_ids):
+    """
+    Batched version of evaluate_hand. Takes an (N, 5-7) integer array
+    of card ids, one hand per row, and returns an array of the N hand
+    values in a single vectorized pass.
+    """
+    card_ids = np.asarray(card_ids, dtype=np.intp)
+    if card_ids.ndim != 2 or not 5 <= card_ids.shape[1] <= 7:
+        raise ValueError("Hands must be an (N, 5-7) array of card ids")
+
+    rank_keys = _RANK_KEYS_NP[card_ids].sum(axis=1)
+    values = _RANK_TABLE_VALUES_NP[np.searchsorted(_RANK_TABLE_KEYS_NP, rank_keys)]
+
+    flush_suits = _FLUSH_SUITS_NP[_SUIT_KEYS_NP[card_ids].sum(axis=1)]
+    flushes = flush_suits >= 0
+    if flushes.any():
+        # same as evaluate_hand, a flush only needs the mask of its suited ranks
+        flush_hands = card_ids[flushes]
+        suited = (flush_hands & 3) == flush_suits[flushes, np.newaxis]
+        rank_masks = (_RANK_BITS_NP[flush_hands] * suited).sum(axis=1)
+        values[flushes] = _FLUSH_TABLE_NP[rank_masks]
+    return values
+
+
+         #######################################################
+      ####                                                     ####
+    ###                      EQUITY ENGINE                        ###
+      ####                                                     ####
+         #######################################################
+
+# if the rest of the board can be dealt this many ways or fewer, every
+# run out is scored instead of sampling (covers the turn and river, and
+# the flop for a few players). Scoring that many boards takes a few
+# milliseconds, so exact results always fit in the time budget.
+EXACT_EQUITY_BOARDS = 1000
+# seconds a query may spend sampling boards, counted from when its jobs
+# are handed to the equity pool
+EQUITY_TIME_BUDGET = 0.5
+# amount of boards sampled and scored together by evaluate_hands
+EQUITY_BATCH_SIZE = 2000
+
+# created on first use so that importing this module doesn't start processes
+_EQUITY_POOL = None
+
+
+def get_equity_pool():
+    """
+    Returns the process pool used to calculate equity, creating it
+    the first time it is needed. It has one worker per core.
+    """
+    global _EQUITY_POOL
+    if _EQUITY_POOL is None:
+        _EQUITY_POOL = ProcessPoolExecutor(max_workers=os.cpu_count())
+    return _EQUITY_POOL
+
+
+def _score_runouts(hole_ids, board_ids, runouts, opponents=0):
+    """
+    Deals every row of runouts (an (M, k) array of card ids) onto the
+    board, the cards after the board going to opponents random
+    opponents, and returns the amount of wins and ties and the share of
+    the pots won by each player in hole_ids
+    """
+    to_come = 5 - len(board_ids)
+    hands = np.empty((len(runouts), 7), dtype=np.intp)
+    hands[:, 2:2 + len(board_ids)] = board_ids
+    hands[:, 2 + len(board_ids):] = runouts[:, :to_come]
+    holes = list(hole_ids)
+    holes.extend(runouts[:, to_come + 2 * opponent:to_come + 2 + 2 * opponent]
+                 for opponent in range(opponents))
+    values = np.empty((len(holes), len(runouts)), dtype=np.int32)
+    for (index, hole) in enumerate(holes):
+        hands[:, :2] = hole
+        values[index] = evaluate_hands(hands)
+    winners = values[:len(hole_ids)] == values.max(axis=0)
+    splits = (values == values.max(axis=0)).sum(axis=0)
+    wins = (winners & (splits == 1)).sum(axis=1)
+    ties = (winners & (splits > 1)).sum(axis=1)
+    shares = (winners / splits).sum(axis=1)
+    return (wins, ties, shares)
+
+
+def _remaining_deck(hole_ids, board_ids):
+    """
+    Returns an array of the card ids that are not in anyone's hand or
+    on the board
+    """
+    known = set(board_ids)
+    for hole in hole_ids:
+        known.update(hole)
+    return np.array([card_id for card_id in range(52) if card_id not in known],
+                    dtype=np.intp)
+
+
+def _exact_equity(hole_ids, board_ids):
+    """
+    Scores every possible run out of the board. Returns a tuple of the
+    wins, ties and pot shares of each player and the amount of boards
+    scored.
+    """
+    deck = _remaining_deck(hole_ids, board_ids)
+    to_come = 5 - len(board_ids)
+    if to_come == 0:
+        runouts = np.empty((1, 0), dtype=np.intp)
+    else:
+        runouts = deck[np.array(list(combinations(range(len(deck)), to_come)),
+                                dtype=np.intp)]
+    (wins, ties, shares) = _score_runouts(hole_ids, board_ids, runouts)
+    return (wins, ties, shares, len(runouts))
+
+
+def _monte_carlo_equity(hole_ids, board_ids, opponents, deadline, max_trials, seed):
+    """
+    Samples run outs of the board (and the hands of opponents random
+    opponents) in batches until the time.time() deadline has passed or
+    max_trials run outs are scored, either can be None for no limit.
+    Returns the same tuple as _exact_equity.
+    """
+    rng = np.random.default_rng(seed)
+    deck = _remaining_deck(hole_ids, board_ids)
+    to_deal = 5 - len(board_ids) + 2 * opponents
+    wins = np.zeros(len(hole_ids), dtype=np.int64)
+    ties = np.zeros(len(hole_ids), dtype=np.int64)
+    shares = np.zeros(len(hole_ids), dtype=np.float64)
+    trials = 0
+    # always score at least one batch, even if the deadline has passed
+    # (the job waited too long in the pool)
+    while trials == 0 or ((deadline is None or time.time() < deadline)
+                          and (max_trials is None or trials < max_trials)):
+        size = EQUITY_BATCH_SIZE if max_trials is None else min(EQUITY_BATCH_SIZE,
+                                                                 max_trials - trials)
+        # the first to_deal columns of a random partition are a sample
+        # of distinct cards
+        picks = rng.random((size, len(deck))).argpartition(to_deal, axis=1)
+        (batch_wins, batch_ties, batch_shares) = _score_runouts(
+            hole_ids, board_ids, deck[picks[:, :to_deal]], opponents)
+        wins += batch_wins
+        ties += batch_ties
+        shares += batch_shares
+        trials += size
+    return (wins, ties, shares, trials)
+
+
+def _equity_jobs(hole_ids, board_ids, opponents, time_budget, max_trials=None):
+    """
+    Returns a list of (function, args) jobs whose results add up to
+    the equity of every hand. Sampling jobs stop by themselves once
+    time_budget seconds from now have passed (the deadline is wall clock
+    time, so it works in the pool's processes) or, between them, they
+    have scored max_trials run outs. A job that is given up on doesn't
+    keep its worker busy for long.
+    """
+    deck_size = len(_remaining_deck(hole_ids, board_ids))
+    to_come = 5 - len(board_ids)
+    runout_count = 1
+    for index in range(to_come):
+        runout_count = runout_count * (deck_size - index) // (index + 1)
+    # random opponents are always sampled
+    if opponents == 0 and runout_count <= EXACT_EQUITY_BOARDS:
+        return [(_exact_equity, (hole_ids, board_ids))]
+    deadline = time.time() + time_budget
+    # one sampling job per worker (fewer if there are only a few batches
+    # of trials), each with its own seed
+    job_count = os.cpu_count() or 1
+    if max_trials is not None:
+        job_count = max(min(job_count, max_trials // EQUITY_BATCH_SIZE), 1)
+    return [(_monte_carlo_equity, (hole_ids, board_ids, opponents, deadline,
+                                   None if max_trials is None else -(-max_trials // job_count),
+                                   random.getrandbits(64)))
+            for _ in range(job_count)]
+
+
+def _combine_equity(results):
+    """
+    Adds up the results of every job and turns them into a list of
+    (win %, tie %, equity %) tuples, one for each hand. The equity is
+    the share of the pot the hand wins on average, with split pots
+    counted as the part of the pot the hand gets.
+    """
+    wins = sum(result[0] for result in results)
+    ties = sum(result[1] for result in results)
+    shares = sum(result[2] for result in results)
+    trials = sum(result[3] for result in results)
+    return [(100 * float(wins[index]) / trials, 100 * float(ties[index]) / trials,
+             100 * float(shares[index]) / trials)
+            for index in range(len(wins))]
+
+
+_SUIT_PERMUTATIONS = tuple(permutations(range(4)))
+
+
+def canonical_equity_query(hands, community_cards, opponents=0):
+    """
+    Converts an equity query to ids and puts it in a canonical form.
+    Queries that only differ by which suit is which, or by the order of
+    the hands, have the same equity and get the same canonical form.
+    Returns a tuple of the canonical (board, hands, opponents) key and
+    a list with the index in hands of each of the key's hands.
+    """
+    if len(hands) + opponents < 2:
+        raise ValueError("Equity needs at least 2 hands")
+    if any(len(hand) != 2 for hand in hands):
+        raise ValueError("Player hands must contain 2 cards")
+    if len(community_cards) > 5:
+        raise ValueError("Table must contain 0-5 cards")
+    hole_ids = [[card_to_id(c) for c in hand] for hand in hands]
+    board_ids = [card_to_id(c) for c in community_cards]
+
+    # try every relabeling of the suits and keep the smallest result
+    best = None
+    for permutation in _SUIT_PERMUTATIONS:
+        board = tuple(sorted((c & ~3) | permutation[c & 3] for c in board_ids))
+        ordered = sorted((tuple(sorted((c & ~3) | permutation[c & 3] for c in hole)), index)
+                         for (index, hole) in enumerate(hole_ids))
+        key = (board, tuple(hole for (hole, _) in ordered), opponents)
+        if best is None or key < best[0]:
+            best = (key, [index for (_, index) in ordered])
+    return best
+
+
+class EquityCache():
+    """
+    Bounded LRU cache of equity results, keyed by the canonical form of
+    the query (board, hands and amount of random opponents). Counts hits and misses so the cache can be monitored.
+    """
+    def __init__(self, max_size):
+        self.entries = OrderedDict()
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """
+        Returns the cached result for key, or None if there isn't one
+        """
+        result = self.entries.get(key)
+        if result is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return result
+
+    def put(self, key, result):
+        """
+        Stores a result, dropping the least recently used one if full
+        """
+        self.entries[key] = result
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def get_debug_str(self):
+        """
+        Returns a string with the size and hit rate of the cache
+        """
+        lookups = self.hits + self.misses
+        hit_rate = 100 * self.hits / lookups if lookups else 0
+        return ("Equity cache:\n"
+                f"\tsize: {len(self.entries)}/{self.max_size}\n"
+                f"\thits: {self.hits}\n"
+                f"\tmisses: {self.misses}\n"
+                f"\thit rate: {hit_rate:.1f}%\n")
+
+
+# amount of equity results kept for repeated queries
+EQUITY_CACHE_SIZE = 4096
+EQUITY_CACHE = EquityCache(EQUITY_CACHE_SIZE)
+
+
+def _uncanonical_equity(result, order):
+    """
+    Puts the results for the canonical hands back in the original order
+    """
+    equity = [None] * len(order)
+    for (canonical_index, index) in enumerate(order):
+        equity[index] = result[canonical_index]
+    return equity
+
+
+def calculate_equity(hands, community_cards, time_budget=EQUITY_TIME_BUDGET, opponents=0,
+                     max_trials=None):
+    """
+    Returns a list with the (win %, tie %, equity %) of each hand in
+    hands (lists of 2 Cards) given the community_cards dealt so far and
+    opponents more players whose cards aren't known. Boards with few
+    cards left to come are enumerated exactly (at most
+    EXACT_EQUITY_BOARDS run outs, which is quicker than any time budget
+    so time_budget isn't checked), otherwise boards are sampled on every
+    core of the equity pool for time_budget seconds, or until max_trials
+    boards are sampled.
+    Results are cached in EQUITY_CACHE. This blocks until the result
+    is ready, so use calculate_equity_async from the event loop.
+    """
+    (key, order) = canonical_equity_query(hands, community_cards, opponents)
+    result = EQUITY_CACHE.get(key)
+    if result is None:
+        (board, holes, _) = key
+        pool = get_equity_pool()
+        futures = [pool.submit(job, *args)
+                   for (job, args) in _equity_jobs(holes, board, opponents, time_budget,
+                                                   max_trials)]
+        result = _combine_equity([future.result() for future in futures])
+        EQUITY_CACHE.put(key, result)
+    return _uncanonical_equity(result, order)
+
+
+async def calculate_equity_async(hands, community_cards, time_budget=EQUITY_TIME_BUDGET,
+                                 opponents=0, max_trials=None):
+    """
+    Same as calculate_equity, but waits for the equity pool without
+    blocking the event loop
+    """
+    (key, order) = canonical_equity_query(hands, community_cards, opponents)
+    result = EQUITY_CACHE.get(key)
+    if result is None:
+        (board, holes, _) = key
+        loop = asyncio.get_running_loop()
+        pool = get_equity_pool()
+        results = await asyncio.gather(*[loop.run_in_executor(pool, job, *args)
+                                         for (job, args) in _equity_jobs(holes, board, opponents,
+                                                                         time_budget,
+                                                                         max_trials)])
+        result = _combine_equity(results)
+        EQUITY_CACHE.put(key, result)
+    return _uncanonical_equity(result, order)
+
+
+         #######################################################
+      ####                                                     ####
+    ###                  PREFLOP EQUITY TABLE                     ###
+      ####                                                     ####
+         #######################################################
+
+# equity of every starting hand class against 1-8 random opponents,
+# built by build_tables.py
+PREFLOP_EQUITY_PATH = "configs/preflop_equity.npy"
+PREFLOP_MAX_OPPONENTS = 8
+PREFLOP_TRIALS = 100000
+
+
+def preflop_class(hand):
+    """
+    Returns the index (0-168) of the starting hand class of a 2 card
+    hand. Classes are laid out on a 13x13 grid of ranks: pairs on the
+    diagonal, suited hands at [high][low] and offsuit hands at
+    [low][high].
+    """
+    (first, second) = (card_to_id(hand[0]), card_to_id(hand[1]))
+    (high, low) = (max(first >> 2, second >> 2), min(first >> 2, second >> 2))
+    if first & 3 == second & 3:
+        return high * 13 + low
+    return low * 13 + high
+
+
+def build_preflop_equity_table(path=PREFLOP_EQUITY_PATH, trials=PREFLOP_TRIALS):
+    """
+    Samples the equity of every starting hand class against 1 to
+    PREFLOP_MAX_OPPONENTS random opponents and saves it to path as a
+    (169, PREFLOP_MAX_OPPONENTS) float32 array. Slow, only needs to be
+    run when the table is missing.
+    """
+    table = np.zeros((169, PREFLOP_MAX_OPPONENTS), dtype=np.float32)
+    pool = get_equity_pool()
+    futures = {}
+    for high in range(13):
+        for low in range(high + 1):
+            # one representative hand for each class, ids are rank * 4 + suit
+            pair_or_offsuit = [high * 4, low * 4 + 1]
+            suited = [high * 4, low * 4]
+            classes = [(high * 13 + low, pair_or_offsuit if high == low else suited)]
+            if high != low:
+                classes.append((low * 13 + high, pair_or_offsuit))
+            for (index, hole_ids) in classes:
+                for opponents in range(1, PREFLOP_MAX_OPPONENTS + 1):
+                    futures[(index, opponents - 1)] = pool.submit(
+                        _monte_carlo_equity, [hole_ids], [], opponents, None, trials,
+                        random.getrandbits(64))
+    for (cell, future) in futures.items():
+        (_, _, shares, sampled) = future.result()
+        table[cell] = shares[0] / sampled
+    np.save(path, table)
+    return table
+
+
+def _load_preflop_equity(path=PREFLOP_EQUITY_PATH):
+    """
+    Memory maps the preflop equity table. The mapping is read only, so
+    every bot process shares the same pages of the file.
+    """
+    try:
+        return np.load(path, mmap_mode="r")
+    except FileNotFoundError:
+        logging.warning("Preflop equity table %s not found, run build_tables.py", path)
+        return None
+
+
+PREFLOP_EQUITY = _load_preflop_equity()
+
+
+def preflop_equity(hand, opponents):
+    """
+    Returns the share of the pot (0-1) that a 2 card hand wins on
+    average against the given amount of random opponents, or None if
+    the preflop equity table isn't available
+    """
+    if PREFLOP_EQUITY is None:
+        return None
+    opponents = min(max(opponents, 1), PREFLOP_MAX_OPPONENTS)
+    return float(PREFLOP_EQUITY[preflop_class(hand), opponents - 1])
+
+
+         #######################################################
+      ####                                                     ####
+    ###                       CPU PLAYERS                         ###
+      ####                                                     ####
+         #######################################################
+
+# most CPU players that can be added to a game (see the /poker command)
+MAX_CPUS = 3
+# seconds a CPU player may think before it falls back to a rough guess
+CPU_DECISION_DEADLINE = 0.3
+# seconds the equity pool samples a CPU player's equity after the flop
+CPU_EQUITY_TIME_BUDGET = 0.1
+# most random deals sampled for a CPU player's equity
+CPU_EQUITY_TRIALS = 4000
+# how much more equity than the pot odds a CPU player wants before raising
+CPU_RAISE_MARGIN = 0.15
+# extra equity the last player to act gives itself for its position
+CPU_POSITION_BONUS = 0.05
+
+
+def choose_cpu_bet(equity, to_call, min_raise, pot, chips, position, players):
+    """
+    Picks a CPU player's action from its equity (expected share of the
+    pot), the pot odds and its position in the betting order. Returns
+    -1 to fold, to_call to call (or check), or a larger amount to raise.
+    to_call is already capped at the CPU's chips.
+    """
+    # acting later gives more information, so play a little looser
+    if players > 1:
+        equity += CPU_POSITION_BONUS * position / (players - 1)
+    # share of the final pot that calling would pay for
+    pot_odds = to_call / (pot + to_call) if to_call > 0 else 0
+    if equity >= pot_odds + CPU_RAISE_MARGIN and chips > to_call:
+        raise_amount = max(pot // 2, min_raise)
+        return min(to_call + raise_amount, chips)
+    if equity >= pot_odds or to_call == 0:
+        return to_call
+    return -1
+
+
+async def decide_cpu_action(hand, community_cards, opponents, to_call, min_raise, pot,
+                            chips, position, players):
+    """
+    Decides how much a CPU player bets (-1 to fold). Before the flop the
+    equity comes from the preflop table, after it from calculate_equity
+    against random opponent hands, so a spot a CPU has already been in
+    comes straight from EQUITY_CACHE. The sampling jobs stop by
+    themselves after CPU_EQUITY_TIME_BUDGET or CPU_EQUITY_TRIALS deals.
+    If the equity still takes longer than CPU_DECISION_DEADLINE (the
+    pool is busy) the CPU uses the preflop equity of its hand instead,
+    so a CPU turn never holds up the game.
+    """
+    opponents = max(opponents, 1)
+    fallback = preflop_equity(hand, opponents)
+    if fallback is None:
+        fallback = 1 / (opponents + 1)
+    equity = fallback
+    if community_cards or PREFLOP_EQUITY is None:
+        try:
+            result = await asyncio.wait_for(
+                calculate_equity_async([hand], community_cards, CPU_EQUITY_TIME_BUDGET,
+                                       opponents, CPU_EQUITY_TRIALS),
+                CPU_DECISION_DEADLINE)
+            equity = result[0][2] / 100
+        except asyncio.TimeoutError:
+            logging.info("CPU decision ran out of time, using preflop equity")
+    return choose_cpu_bet(equity, to_call, min_raise, pot, chips, position, players)
+
+
+         #######################################################
+      ####                                                     ####
+    ###                       HAND HISTORY                        ###
+      ####                                                     ####
+         #######################################################
+
+# every finished hand is written here, the oldest files roll over
+HAND_HISTORY_PATH = "logs/poker_hands.txt"
+HAND_HISTORY_MAX_BYTES = 10 * 1024 * 1024
+HAND_HISTORY_BACKUPS = 10
+
+# hand numbers are unique per run of the bot, the run is the date it started
+_HISTORY_SESSION = time.strftime("%Y%m%d%H%M%S")
+_HAND_NUMBERS = itertools.count(1)
+_HISTORY_LOGGER = None
+_HISTORY_LISTENER = None
+
+
+def history_card(card):
+    """
+    Writes a card the way hand histories do, e.g. "Th" for the ten of hearts
+    """
+    rank = "T" if card.value == "10" else card.value
+    return rank + card.name.lower()
+
+
+def history_cards(cards):
+    """
+    Writes a list of cards as "[Ah Kd]"
+    """
+    return "[" + " ".join(history_card(card) for card in cards) + "]"
+
+
+class HandHistory():
+    """
+    Collects the text of one hand in the usual hand history format
+    (seats, blinds, hole cards, actions, streets, showdown and summary).
+    The lines are kept in memory and handed to the background writer
+    in one piece when the hand is settled.
+    """
+    def __init__(self, table_name, seat_order, player_data):
+        self.hand_id = f"{_HISTORY_SESSION}{next(_HAND_NUMBERS):06d}"
+        self.seat_order = list(seat_order)
+        # the small blind sits after the button, heads up the button is the small blind
+        button = len(seat_order) if len(seat_order) > 2 else 1
+        self.lines = [f"Poker Hand #{self.hand_id}: Hold'em No Limit "
+                      f"({SMALL_BLIND}/{BIG_BLIND}) - {time.strftime('%Y/%m/%d %H:%M:%S')}",
+                      f"Table '{table_name}' {len(seat_order)}-max Seat #{button} is the button"]
+        for (seat, player) in enumerate(seat_order, start=1):
+            self.lines.append(f"Seat {seat}: {player.display_name} "
+                              f"({player_data[player].chips} in chips)")
+
+    def record_blinds(self, blinds, player_data):
+        """
+        Writes the blinds, then every player's hole cards
+        """
+        for (name, (player, amount)) in zip(("small", "big"), blinds):
+            all_in = " and is all-in" if player_data[player].chips == 0 else ""
+            self.lines.append(f"{player.display_name}: posts {name} blind {amount}{all_in}")
+        self.lines.append("*** HOLE CARDS ***")
+        for player in self.seat_order:
+            self.lines.append(f"Dealt to {player.display_name} "
+                              f"{history_cards(player_data[player].hand)}")
+
+    def record_bet(self, player, amount, largest_bet, player_data):
+        """
+        Writes a check, call, bet or raise. largest_bet is the largest
+        bet before this one.
+        """
+        name = player.display_name
+        if player_data.round_bet > largest_bet:
+            if largest_bet == 0:
+                action = f"{name}: bets {amount}"
+            else:
+                action = (f"{name}: raises {player_data.round_bet - largest_bet} "
+                          f"to {player_data.round_bet}")
+        elif amount == 0:
+            action = f"{name}: checks"
+        else:
+            action = f"{name}: calls {amount}"
+        if player_data.chips == 0:
+            action += " and is all-in"
+        self.lines.append(action)
+
+    def record_fold(self, player):
+        """
+        Writes a fold
+        """
+        self.lines.append(f"{player.display_name}: folds")
+
+    def record_street(self, community_cards, new_count):
+        """
+        Writes the flop, turn or river
+        """
+        old_cards = community_cards[:-new_count]
+        new_cards = community_cards[-new_count:]
+        if not old_cards:
+            self.lines.append(f"*** FLOP *** {history_cards(new_cards)}")
+        else:
+            street = "TURN" if len(community_cards) == 4 else "RIVER"
+            self.lines.append(f"*** {street} *** {history_cards(old_cards)} "
+                              f"{history_cards(new_cards)}")
+
+    def record_showdown(self, contenders, player_data, payouts, community_cards):
+        """
+        Writes the hands that were shown, who collected what and the summary
+        """
+        if len(contenders) > 1:
+            self.lines.append("*** SHOW DOWN ***")
+            for player in contenders:
+                data = player_data[player]
+                self.lines.append(f"{player.display_name}: shows {history_cards(data.hand)} "
+                                  f"({data.strength.describe()})")
+        for (player, amount) in payouts.items():
+            if amount > 0:
+                self.lines.append(f"{player.display_name} collected {amount} from pot")
+        self.lines.append("*** SUMMARY ***")
+        self.lines.append(f"Total pot {sum(payouts.values())}")
+        if community_cards:
+            self.lines.append(f"Board {history_cards(community_cards)}")
+
+    def __str__(self):
+        return "\n".join(self.lines) + "\n"
+
+
+class _HistoryFileHandler(logging.handlers.RotatingFileHandler):
+    """
+    Rotating file handler that makes the folder of its file when it
+    opens it. With delay=True that's on the first record it writes, in
+    the listener thread, instead of when it's made.
+    """
+    def _open(self):
+        os.makedirs(os.path.dirname(self.baseFilename), exist_ok=True)
+        return super()._open()
+
+
+def get_hand_history_logger():
+    """
+    Returns the logger that hand histories are written to, setting it up
+    the first time. Records go through a queue to a listener thread
+    that owns the rotating files, so writing a hand never waits on the
+    disk, not even the first one (the folder is made and the file opened
+    by the listener thread). The listener is stopped (and the queue
+    flushed) at exit.
+    """
+    global _HISTORY_LOGGER, _HISTORY_LISTENER
+    if _HISTORY_LOGGER is None:
+        file_handler = _HistoryFileHandler(
+            HAND_HISTORY_PATH, maxBytes=HAND_HISTORY_MAX_BYTES,
+            backupCount=HAND_HISTORY_BACKUPS, encoding="utf-8", delay=True)
+        file_handler.setFormatter(logging.Formatter("%(message)s"))
+        records = queue.SimpleQueue()
+        _HISTORY_LISTENER = logging.handlers.QueueListener(records, file_handler)
+        _HISTORY_LISTENER.start()
+        atexit.register(_HISTORY_LISTENER.stop)
+        logger = logging.getLogger("poker.history")
+        logger.setLevel(logging.INFO)
+        # hand histories only go to their own files
+        logger.propagate = False
+        logger.addHandler(logging.handlers.QueueHandler(records))
+        _HISTORY_LOGGER = logger
+    return _HISTORY_LOGGER
+
+
+def write_hand_history(history):
+    """
+    Queues a finished hand to be written to the hand history files
+    """
+    get_hand_history_logger().info("%s", history)
@@ -5,18 +5,35 @@ It features an closed game model, meaning not all users can interact
 with the game at any time, and there is player management.
 """
 import random
+from array import array
 import discord
 from games.game import BaseGame
 from games.game import GameManager
 from games.game import BasePlayer
 from util import Card
+from util import CpuUser
 
 
+# card buttons on one page of the "Show Hand" menu, discord allows 25
+# components in a view and the last row is kept for the page buttons
+HAND_PAGE_SIZE = 20
+# most announcement lines shown above the base menu, the latest are kept
+MAX_ANNOUNCEMENT_LINES = 15
+# what UnoManager announces for each event in UnoGame.events
+UNO_EVENTS = {
+    "reshuffle": "The deck is empty! Shuffling in the discard pile...",
+    "reverse": "Reversing the turn order!",
+    "skip": "{name} got skipped! LOL!",
+    "draw two": "{name} eats two cards! LMAO!",
+    "draw four": "{name} eats four cards! ROFL!!",
+    "one card": "Oh fuck! {name} has only one card left!",
+}
+
 
 class UnoPlayer(BasePlayer):
     """
     Represents an player of the uno game. Extended from the BasePlayer
-    class to include a few extra attributes: a list that represents
+    class to include a few extra attributes: an UnoHand that represents
     the player's hand, a boolean to flag when the player has been 
     skipped, and a method to determine which cards in the player's 
     hand are playable given the game state's top card. 
@@ -26,10 +43,21 @@ class UnoPlayer(BasePlayer):
     can delete the interaction message if the player presses "Draw"
     instead of a playing a card. Otherwise, the "Show Hand" menu
     will linger until it deletes itself. 
+
+    is_cpu flags the seats played by choose_cpu_move.
     """
-    def __init__(self):
+    def __init__(self, is_cpu=False):
         super().__init__()
-        self.hand = []
+        self.is_cpu = is_cpu
+        self.hand = UnoHand()
+        self.skipped = False
+        self.active_interaction = None
+
+    def reset(self):
+        """
+        Empties the player's hand for a new round
+        """
+        self.hand.clear()
         self.skipped = False
         self.active_interaction = None
 
@@ -38,40 +66,183 @@ class UnoPlayer(BasePlayer):
         Used by the button menu to determine which cards can be
         enabled.
         """
-        playable_cards = [card for card in self.hand if card.name == top_card.name \
-            or card.value == top_card.value or card.name == "Wild" ]
-        return playable_cards
+        return list(self.hand.cards_in(self.hand.playable(top_card)))
 
 
 class UnoGame(BaseGame):
     """
     Uno game model class to represent the game state of Uno. It is
     extended from BaseGame to include extra properties:
-        1. deck: List of Card objects that represents the deck of 
-           Uno cards.
-        2. discard: List of Card objects that represents the discard 
-           pile, required to be tracked to replenish the deck when 
-           it's empty.
-        3. turn_order: List of whatever type 'discord.interaction.user'
+        1. deck: UnoDeck that holds the draw pile and the discard
+           pile as card ids. The discard pile is required to be
+           tracked to replenish the draw pile when it's empty.
+        2. turn_order: List of whatever type 'discord.interaction.user'
            is supposed to be. We use this list to maintain turn order.
-        4. turn_index: Integer iterator over turn_order to know who
+        3. turn_index: Integer iterator over turn_order to know who
            the current turn belongs to.
-        5. reversed: Boolean to flag when the turn_order should be
+        4. reversed: Boolean to flag when the turn_order should be
            reversed. 
-        6. top_card: A Card object that represents the Uno card at 
+        5. top_card: A Card object that represents the Uno card at 
            the middle of the table that the players need to match
            color or value.
+        6. events: List of (event, user) tuples for what happened since
+           the manager last announced them, see UNO_EVENTS.
+        7. rng: Where the shuffles and the starting player come from.
+    The rules (setup, draw_cards, play_card, next_turn) don't need
+    discord, so the simulator in benchmarks/uno_sim.py can play them.
     """
-    def __init__(self):
+    def __init__(self, cpus=0, rng=random):
         # game state 1 -> accepting players but not playing yet
-        super().__init__(game_type=3, player_data={}, game_state=1)
-
-        self.deck = []
-        self.discard = []
-        self.turn_order = []
+        cpus = min(max(cpus, 0), MAX_CPUS)
+        super().__init__(game_type=3, player_data={}, game_state=1, cpus=cpus)
+        # computer players take their seats right away and stay for every round
+        for number in range(1, cpus + 1):
+            self.player_data[CpuUser(number)] = UnoPlayer(is_cpu=True)
+
+        self.deck = UnoDeck()
+        self.turn_order = list(self.player_data)
         self.turn_index = 0
         self.reversed = False
         self.top_card = UnoCard("None", "")
+        self.events = []
+        self.rng = rng
+
+    def get_active_player(self):
+        """
+        Returns the user whose turn it is
+        """
+        if not self.turn_order:
+            return None
+        return self.turn_order[self.turn_index]
+
+    def setup(self):
+        '''
+        setup: Sets up a round by shuffling the whole Uno deck, having
+        each player draw 7 cards, choosing an appropriate top card
+        ("Reverse", "Skip", "Draw Two", and "Wild" cards are not
+        considered appropriate to start the game) and choosing a random
+        player to start the game.
+        '''
+        # Put every card back in the deck
+        self.deck.reset()
+        self.deck.shuffle(self.rng)
+        self.reversed = False
+        # Each player gets 7 cards to start
+        for player in self.player_data.values():
+            player.reset()
+            self.draw_cards(player, 7)
+        # Assign the top-card. The game cannot begin on a "Reverse", "Skip", "Draw Two", or "Wild"
+        while True:
+            self.top_card = self.deck.draw()
+            if self.top_card.value in ("Reverse", "Skip", "Draw Two") \
+            or self.top_card.name == "Wild":
+                self.deck.discard_card(self.top_card)
+                continue
+            break
+        # Shuffle the ordering and select a random player to start the game
+        self.rng.shuffle(self.turn_order)
+        self.turn_index = self.rng.randint(0, len(self.turn_order)-1)
+
+    def draw_cards(self, player, num_cards=1):
+        '''
+        draw_cards: Adds num_cards cards from the top of the deck to the
+        UnoPlayer's hand and returns them. If the deck is empty the
+        discard pile is shuffled back in first. Returns fewer cards
+        if every card is already in someone's hand.
+        '''
+        cards = []
+        for _ in range(num_cards):
+            if len(self.deck) == 0:
+                if self.deck.discard_size == 0:
+                    break
+                self.events.append(("reshuffle", None))
+                self.deck.reshuffle(self.rng)
+            card = self.deck.draw()
+            player.hand.add(card)
+            cards.append(card)
+        return cards
+
+    def update_turn_index(self):
+        '''
+        update_turn_index: Moves turn_index to the next player, see
+        get_next_turn_index.
+        '''
+        self.turn_index = self.get_next_turn_index()
+
+    def get_next_turn_index(self):
+        '''
+        get_next_turn_index: This method tells us who the next player
+        is by returning an integer that would be the next turn_index,
+        taking into account whether the game state is reversed or not,
+        and wrapping around the ends of the turn_order.
+        This method is called when a player plays a "Skip", "Draw Two",
+        and "Draw Four" card to determine which UnoPlayer object needs
+        to be flagged as 'skipped', as well as forcing feeding that 
+        player some cards on "Draw Two" and "Draw Four".
+        '''
+        step = -1 if self.reversed else 1
+        return (self.turn_index + step) % len(self.turn_order)
+
+    def play_card(self, user, card, color=None):
+        '''
+        play_card: Plays a card from user's hand. The top card is
+        replaced with that card, or with a placeholder card of color
+        if it's Wild. Then, depending on the card:
+            a. "Skip": Determine next player and flag them as 'skipped'
+            b. "Reverse": Switch the game state's 'reversed' property.
+            c. "Draw Two": Skip next player and force feed two cards.
+            d. "Draw Four": Skip next player and force feed four cards.
+        Finally the card is removed from the player's hand. Returns True
+        if that was their last card (they won), the caller moves on with
+        next_turn() otherwise.
+        '''
+        # We put add the top card to the discard pile,
+        # but only if it's not a placeholder card
+        if self.top_card.value != "Card":
+            self.deck.discard_card(self.top_card)
+        # Then we can replace the top card with the played card, unless it's wild.
+        # A wild card goes straight to the discard pile under its placeholder
+        if card.name == "Wild":
+            self.deck.discard_card(card)
+            self.top_card = WILD_TOP_CARDS[color]
+        else:
+            self.top_card = card
+        # If card is "Skip", "Draw Two", or "Draw Four", you will need a victim
+        victim_user = self.turn_order[self.get_next_turn_index()]
+        victim = self.player_data[victim_user]
+        if card.value == "Reverse":
+            self.reversed = not self.reversed
+            self.events.append(("reverse", None))
+        elif card.value == "Skip":
+            self.events.append(("skip", victim_user))
+            victim.skipped = True
+        elif card.value == "Draw Two":
+            self.events.append(("draw two", victim_user))
+            self.draw_cards(victim, 2)
+            victim.skipped = True
+        elif card.value == "Draw Four":
+            self.events.append(("draw four", victim_user))
+            self.draw_cards(victim, 4)
+            victim.skipped = True
+        # Remove the played card from the player's hand
+        player = self.player_data[user]
+        player.hand.remove(card)
+        if len(player.hand) == 1:
+            self.events.append(("one card", user))
+        return len(player.hand) == 0
+
+    def next_turn(self):
+        '''
+        next_turn: Calls update_turn_index() until a player that is not
+        flagged as 'skipped' is found, restoring the flag of the players
+        it skips over.
+        '''
+        self.update_turn_index()
+        next_player = self.player_data[self.turn_order[self.turn_index]]
+        while next_player.skipped:
+            next_player.skipped = False
+            self.update_turn_index()
+            next_player = self.player_data[self.turn_order[self.turn_index]]
 
 
 class UnoManager(GameManager):
@@ -86,27 +257,38 @@ class UnoManager(GameManager):
     5. start_new_round: return to "player join" phase
     6. setup: Sets up the table and players' hands
     7. draw_cards: Gives player cards from the deck
-    8. regenerate_deck: Replenishes the deck when its empty
-    9. get_player_hand: Handy getter of a player's hand
-    10. update_turn_index: Increment or decrement turn index
-    11. get_next_turn_index: Tells what the current turn index is
-    12. play_card: Handles events of playing a card
-    13. next_turn: Update turn index, skipping 'skipped' players
-    14. announce: Gives each player important information
-    15. card_to_emoji: Returns emoji of a card (colon-flanked-text)
-    16. color_to_emoji: Returns emoji of a card (actual-emoji)
+    8. get_player_hand: Handy getter of a player's hand
+    9. get_hand_pages: The cached pages of a player's "Show Hand" menu
+    10. play_card: Handles events of playing a card
+    11. next_turn: Update turn index, skipping 'skipped' players
+    12. announce_events: Announces what the rules reported
+    13. announce: Gives each player important information
+    14. card_to_emoji: Returns emoji of a card (colon-flanked-text)
+    15. color_to_emoji: Returns emoji of a card (actual-emoji)
+    The rules themselves live in UnoGame, these methods add the buttons
+    and messages around them.
     '''
-    def __init__(self, factory, channel):
-        super().__init__(game=UnoGame(), base_gui=UnoButtonsBase(self),
+    def __init__(self, factory, channel, cpus=0):
+        super().__init__(game=UnoGame(cpus), base_gui=UnoButtonsBase(self),
                          channel=channel, factory=factory, preferences_gui=UnoButtonsPreferences(self))
-
-    async def add_player(self, interaction, init_player_data=UnoPlayer()):
+        # player -> ((hand version, top card), pages) of their "Show Hand" menu
+        self.hand_pages = {}
+        # stops run_cpu_turns from running again while CPUs are taking turns
+        self.cpus_acting = False
+        # announcements made since the base menu was last updated
+        self.announcements = []
+        # announcements shown above the base menu until the next turn
+        self.shown_announcements = []
+
+    async def add_player(self, interaction, init_player_data=None):
         '''
         add_player: Called when a person presses the "Join" button.
         This method add the member to the game state's player_data as 
         well as adding their interaction.user to the turn_order.
         '''
-        #init_player_data = UnoPlayer()
+        # every player needs their own hand
+        if init_player_data is None:
+            init_player_data = UnoPlayer()
         await super().add_player(interaction, init_player_data)
         if interaction.user in self.game.player_data \
         and interaction.user not in self.game.turn_order:
@@ -137,6 +319,7 @@ class UnoManager(GameManager):
         if interaction.user not in self.game.player_data \
         and interaction.user in self.game.turn_order:
             self.game.turn_order.remove(interaction.user)
+            self.hand_pages.pop(interaction.user, None)
         # if nobody else is left, then quit the game
         if self.game.players == 0:
             await self.quit_game(interaction)
@@ -157,6 +340,11 @@ class UnoManager(GameManager):
         self.base_gui = UnoButtonsBaseGame(self)
         # setup the game board
         await self.setup()
+        # a CPU might be first
+        await self.run_cpu_turns(interaction)
+        if self.game.game_state != 4:
+            return
+        self.take_announcements()
         await self.resend(interaction)
 
     def get_base_menu_string(self):
@@ -169,6 +357,8 @@ class UnoManager(GameManager):
         elif self.game.game_state == 4:
             output = f"Top Card: {self.card_to_emoji(self.game.top_card)} \n \
                 It's {self.game.turn_order[self.game.turn_index]} turn!"
+            if self.shown_announcements:
+                output = "\n".join(self.shown_announcements) + "\n\n" + output
             return output
         return "Game has started!"
 
@@ -180,6 +370,8 @@ class UnoManager(GameManager):
         for player in self.game.turn_order:
             self.game.player_data[player].reset()
         self.game.game_state = 1
+        self.announcements.clear()
+        self.shown_announcements = []
         # allow players to join
         self.base_gui = UnoButtonsBase(self)
         await self.resend(interaction)
@@ -187,72 +379,27 @@ class UnoManager(GameManager):
     async def setup(self):
         '''
         setup: Called before allowing the player to actually play a 
-        round of Uno. This method sets up the game state by populating
-        and shuffling the Uno deck, choosing an appropriate top card 
-        ("Reverse", "Skip", "Draw Two", and "Draw Four" cards are not 
-        considered appropriate to start the game), choosing a random 
-        player to start the game, and having each player draw 7 cards.
+        round of Uno, see UnoGame.setup.
         '''
         self.quick_log("Setting up the game of Uno...")
-        # Create the deck
-        self.game.discard.clear()
-        self.game.deck = self.generate_deck()
-        random.shuffle(self.game.deck)
-        # Each player gets 7 cards to start
-        for i in self.game.player_data:
-            await self.draw_cards(self.game.player_data[i], 7)
-        # Assign the top-card. The game cannot begin on a "Reverse", "Skip", "Draw Two", or "Wild"
-        while True:
-            self.game.top_card = self.game.deck.pop()
-            top_card_is_valid = True
-            if self.game.top_card.value == "Reverse":
-                top_card_is_valid = False
-            if self.game.top_card.value == "Skip":
-                top_card_is_valid = False
-            if self.game.top_card.value == "Draw Two":
-                top_card_is_valid = False
-            if self.game.top_card.name == "Wild":
-                top_card_is_valid = False
-            if not top_card_is_valid:
-                self.game.discard.append(self.game.top_card)
-                continue
-            else:
-                break
-        # Shuffle the ordering and select a random player to start the game
-        random.shuffle(self.game.turn_order)
-        self.game.turn_index = random.randint(0, len(self.game.turn_order)-1)
+        self.game.setup()
+        await self.announce_events()
 
     async def draw_cards(self, player, num_cards=1):
         '''
         draw_cards: Takes an UnoPlayer object as an argument, as well 
         as an optional integer, and adds cards to the UnoPlayer's hand
-        from the top of the deck. If the deck is empty, this method
-        calls regenerate_deck() to replenish it. If an optional integer
-        argument is provided, this method adds that many cards to the 
-        players hand. Otherwise, it defaults to adding only 1 card.
+        from the top of the deck, announcing it if the discard pile had
+        to be shuffled back in. If an optional integer argument is
+        provided, this method adds that many cards to the players hand.
+        Otherwise, it defaults to adding only 1 card and returns it (or
+        None if there was nothing left to draw).
         '''
         self.quick_log("A player is drawing cards...")
-        for _ in range(num_cards):
-            if len(self.game.deck) == 0:
-                await self.announce("The deck is empty! Shuffling in the discard pile...")
-                self.regenerate_deck()
-            card = self.game.deck.pop()
-            player.hand.append(card)
-            player.hand = sorted(player.hand)
+        cards = self.game.draw_cards(player, num_cards)
+        await self.announce_events()
         if num_cards == 1:
-            return card
-
-    def regenerate_deck(self):
-        '''
-        regenerate_deck: This method is called by draw_cards() to 
-        replenish the deck when its empty. It simply shuffles the 
-        discard pile, adds all the cards in the discard pile to the
-        deck, then empties the discard pile.
-        '''
-        self.quick_log("Regenerating the deck...")
-        random.shuffle(self.game.discard)
-        self.game.deck += self.game.discard
-        self.game.discard.clear()
+            return cards[0] if cards else None
 
     def get_player_hand(self, player):
         '''
@@ -260,148 +407,133 @@ class UnoManager(GameManager):
         '''
         return self.game.player_data[player].hand
 
-    def update_turn_index(self):
-        '''
-        update_turn_index: Called after a player plays a card. This
-        method increments or decrements the game state's turn_index 
-        depending on if the game state is reversed or not. This method
-        also returns the turn_index to the beginning or end of the 
-        turn_order if incrementing/decrementing would exceed boundaries.
-        '''
-        index = self.game.turn_index
-        if not self.game.reversed:
-            index += 1
-            if index == len(self.game.turn_order):
-                index = 0
-            self.game.turn_index = index
-        elif self.game.reversed:
-            index -= 1
-            if index == -1:
-                index = len(self.game.turn_order) - 1
-            self.game.turn_index = index
-
-    def get_next_turn_index(self):
+    def get_hand_pages(self, player):
         '''
-        get_next_turn_index: This method tells us who the next player
-        is by returning an integer that would be the next turn_index,
-        taking into account whether the game state is reversed or not.
-        This method is called when a player plays a "Skip", "Draw Two",
-        and "Draw Four" card to determine which UnoPlayer object needs
-        to be flagged as 'skipped', as well as forcing feeding that 
-        player some cards on "Draw Two" and "Draw Four".
+        get_hand_pages: Returns the pages of the player's "Show Hand" menu
+        as lists of (card kind index, count, playable). Identical cards
+        share one entry. The pages are only rebuilt when the player's hand
+        or the top card has changed since the last time.
         '''
-        next_player = self.game.turn_index
-        if not self.game.reversed:
-            next_player += 1
-            if next_player == len(self.game.turn_order):
-                next_player = 0
-            return next_player
-        elif self.game.reversed:
-            next_player -= 1
-            if next_player == -1:
-                next_player = len(self.game.turn_order) - 1
-            return next_player
-
-    async def play_card(self, interaction, card):
+        hand = self.get_player_hand(player)
+        key = (hand.version, self.game.top_card.name, self.game.top_card.value)
+        cached = self.hand_pages.get(player)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        playable = hand.playable(self.game.top_card)
+        cards = [(index, count, bool(playable >> index & 1)) for (index, count) in hand.kinds()]
+        pages = [cards[start:start + HAND_PAGE_SIZE]
+                 for start in range(0, len(cards), HAND_PAGE_SIZE)] or [[]]
+        self.hand_pages[player] = (key, pages)
+        return pages
+
+    async def play_card(self, interaction, card, user=None, color=None):
         '''
         play_card: This method is called when a player presses a 
         button corresponding to a card in their hand. It takes the
-        interaction and the corresponding card as arguments. The top card 
-        is replaced with that card (unless the card is Wild, then we do 
-        it differently). Then, depending on the card, this method branches 
-        off into different cases: 
-            a. "Wild": Prompt the player to choose a color by giving
-            them a new button menu. The new menu will replace the top
-            card with a placeholder card that has no value but does 
-            have the color chosen by the player.
-            b. "Skip": Determine next player and flag them as 'skipped'
-            c. "Reverse": Switch the game state's 'reversed' property.
-            d. "Draw Two": Skip next player and force feed two cards.
-            e. "Draw Four": Skip next player and force feed four cards.
-        At the end of this method, we remove the card from the player's hand,
-        performing a few checks in the process:
-            i. Player has 1 card remaining: Announce this fact to all players
-            ii. Player has 0 cards remaining: This player won. End the game.
-        Finally, if the game didn't end, then we call next_turn() to allow
-        the next player to play a card.
-
-        This method very much upholds the 'God Function' trope. Refactoring may
-        be desired in this area.
+        interaction and the corresponding card as arguments. If the
+        card is Wild, the player is prompted to choose a color by giving
+        them a new button menu. The card is then played by
+        UnoGame.play_card (which handles "Skip", "Reverse", "Draw Two"
+        and "Draw Four") and what happened is announced. If the player
+        has 0 cards remaining they won and the game ends, otherwise
+        we call next_turn() to allow the next player to play a card.
+
+        CPU players pass their user and the color they picked, the
+        interaction is then the one of the human whose turn came before.
         '''
         self.quick_log("A player is playing a card...")
-        # We put add the top card to the discard pile,
-        # but only if it's not a placeholder card
-        if self.game.top_card.value != "Card":
-            self.game.discard.append(self.game.top_card)
-        # Then we can replace the top card with the played card, unless it's wild
-        if card.name == "Wild":
+        if user is None:
+            user = interaction.user
+        if card.name == "Wild" and color is None:
             view = UnoWildCard(self) # Menu to inquire what the next card is
             await interaction.response.send_message("Choose a color!", view = view, \
                 ephemeral=True, delete_after=10)
             await view.wait()
             await interaction.delete_original_response()
-        else: # Not wild, just replace
-            self.game.top_card = card
-        # If card is "Skip", "Draw Two", or "Draw Four", you will need a victim
-        victim_user = self.game.turn_order[self.get_next_turn_index()]
-        victim_name = victim_user.display_name
-        victim_unoplayer = self.game.player_data[victim_user]
-        # If "Reverse" card was played, reverse the queue
-        if card.value == "Reverse":
-            self.game.reversed = not self.game.reversed
-            await self.announce("Reversing the turn order!")
-        # If "Skip" was played, flag them as 'skipped'
-        if card.value == "Skip":
-            await self.announce(victim_name + " got skipped! LOL!")
-            victim_unoplayer.skipped = True
-        # If "Draw Two" was played, make next player draw two cards
-        #    and then flag them as 'skipped'
-        if card.value == "Draw Two":
-            await self.announce(victim_name + " eats two cards! LMAO!")
-            await self.draw_cards(victim_unoplayer, 2)
-            victim_unoplayer.skipped = True
-        # If "Draw Four" was played, make next player draw four cards
-        #    and then flag them as 'skipped'
-        if card.value == "Draw Four":
-            await self.announce(victim_name + " eats four cards! ROFL!!")
-            await self.draw_cards(victim_unoplayer, 4)
-            victim_unoplayer.skipped = True
-        # Remove the played card from the player's hand
-        player = self.game.player_data[interaction.user]
-        player.hand.remove(card)
-        if len(player.hand) == 1:
-            await self.announce("Oh fuck! " + interaction.user.display_name + \
-                " has only one card left!")
-        if len(player.hand) == 0:
-            await self.end_game(interaction)
+            # a color still has to be picked if they let the menu time out
+            color = view.color or random.choice(UNO_COLORS)
+        won = self.game.play_card(user, card, color)
+        await self.announce_events()
+        if won:
+            await self.end_game(interaction, user)
             return
         # Go to next turn
-        await self.next_turn()
-
+        await self.next_turn(interaction)
 
-    async def next_turn(self):
+    async def next_turn(self, interaction):
         '''
-        next_turn: This method calls the update_turn_index() several times,
-        skipping over 'skipped' players and restoring the flag to default, 
-        until a player that is not flagged as 'skipped' is discovered. Then,
-        this method refreshes the base GUI so the new player can take their
-        turn.
+        next_turn: Moves on to the next player that isn't 'skipped' (see
+        UnoGame.next_turn). Then, this method lets the CPUs play until
+        it's a human's turn and refreshes the base GUI so the new player
+        can take their turn.
         '''
         self.quick_log("Going to the next turn...")
-        # Increment (or decrement if turn order reversed) the turn index
-        self.update_turn_index()
+        self.game.next_turn()
+        # run_cpu_turns refreshes the base GUI once the CPUs are done
+        if self.cpus_acting:
+            return
+        await self.run_cpu_turns(interaction)
+        if self.game.game_state == 4:
+            await self.update_base_menu()
 
-        # Check if player is skipped. If so, move on to the next player
-        next_player = self.game.player_data[self.game.turn_order[self.game.turn_index]]
-        while next_player.skipped:
-            next_player.skipped = False
-            self.update_turn_index()
-            next_player = self.game.player_data[self.game.turn_order[self.game.turn_index]]
+    def take_announcements(self):
+        '''
+        take_announcements: Moves the announcements made since the last
+        update over to the ones get_base_menu_string shows.
+        '''
+        self.shown_announcements = self.announcements[-MAX_ANNOUNCEMENT_LINES:]
+        self.announcements = []
 
-        # Refresh the base GUI
+    async def update_base_menu(self):
+        '''
+        update_base_menu: Refreshes the base GUI with the turn's
+        announcements above it, one edit per turn (or per run of CPU
+        turns) instead of a message per announcement.
+        '''
+        self.take_announcements()
         await self.current_active_menu.edit(content=self.get_base_menu_string(),
                                             view=self.base_gui)
 
+    async def run_cpu_turns(self, interaction):
+        '''
+        run_cpu_turns: While it's a CPU player's turn, let it pick a move
+        with choose_cpu_move and make it through play_card or a draw,
+        like a human would. Returns once it's a human's turn again or
+        the game is over.
+        '''
+        if self.cpus_acting:
+            return
+        self.cpus_acting = True
+        try:
+            while self.game.game_state == 4:
+                cpu = self.game.get_active_player()
+                cpu_data = self.game.player_data[cpu]
+                if not cpu_data.is_cpu:
+                    break
+                (card, color) = choose_cpu_move(self.game, cpu)
+                if card is None:
+                    await self.draw_cards(cpu_data)
+                    await self.announce(str(cpu) + " is drawing a card...")
+                    await self.next_turn(interaction)
+                    continue
+                played = self.card_to_emoji(card) if color is None \
+                    else self.card_to_emoji(card) + " (" + color + ")"
+                await self.announce(str(cpu) + " played " + played)
+                await self.play_card(interaction, card, cpu, color)
+        finally:
+            self.cpus_acting = False
+
+    async def announce_events(self):
+        '''
+        announce_events: Announces the events the rules added to
+        game.events, then clears them.
+        '''
+        events = self.game.events
+        self.game.events = []
+        for (event, user) in events:
+            name = user.display_name if user is not None else ""
+            await self.announce(UNO_EVENTS[event].format(name=name))
+
     async def announce(self, announcement):
         '''
         announce: This method is called whenever there is information that
@@ -410,35 +542,10 @@ class UnoManager(GameManager):
             b. Player got force fed cards.
             c. Player has 1 card remaining in hand.
             d. Player won.
+        Announcements are collected and shown together above the base
+        menu the next time it's updated (see update_base_menu).
         '''
-        await self.channel.send(announcement, delete_after=3)
-
-    def generate_deck(self):
-        '''
-        generate_deck: Creates a list of Card objects in accordance with
-        the requirements of an Uno deck:
-            a. One '0' card for each color 'Red', 'Blue', 'Green', 'Yellow'
-            b. Two cards for each color for each number "1-9"
-            c. Two cards for each color for each "Skip", "Reverse", and
-               "Draw Two".
-            d. Four "Wild" cards and four "Wild Draw Four" cards.
-            e. Total of 108 cards.
-        '''
-        deck = []
-        for color in ('Red', 'Yellow', 'Green', 'Blue'):
-            deck.append(UnoCard(color, '0'))
-            for value in range(1,10):
-                deck.append(UnoCard(color, str(value)))
-                deck.append(UnoCard(color, str(value)))
-            for value in range(2):
-                deck.append(UnoCard(color, "Draw Two"))
-                deck.append(UnoCard(color, "Reverse"))
-                deck.append(UnoCard(color, "Skip"))
-        for value in range(4):
-            deck.append(UnoCard("Wild", "Wild"))
-            deck.append(UnoCard("Wild", "Draw Four"))
-        return deck
-
+        self.announcements.append(announcement)
 
     def card_to_emoji(self, card):
         '''
@@ -485,11 +592,16 @@ class UnoManager(GameManager):
             return "🌈"
         return "🟣"
 
-    async def end_game(self, interaction):
+    async def end_game(self, interaction, winner=None):
         """
         Ends the game.
         """
-        await self.announce(interaction.user.display_name + " won! Game game, nerds.")
+        if winner is None:
+            winner = interaction.user
+        await self.announce(winner.display_name + " won! Game game, nerds.")
+        # the last turn's announcements and the winner stay on the final base menu
+        self.take_announcements()
+        await self.current_active_menu.edit(content="\n".join(self.shown_announcements))
         await self.quit_game(interaction)
 
 
@@ -605,7 +717,9 @@ class UnoButtonsBaseGame(discord.ui.View):
         # Send user a new "Show Hand" menu
         self.manager.quick_log(f"{interaction.user} pressed {button.label}!")
         view = UnoCardButtons(self.manager, interaction.user)
-        await interaction.response.send_message("Your cards:", view = view, ephemeral = True)
+        content = "Your cards:" if len(view.pages) == 1 \
+            else f"Your cards (page 1/{len(view.pages)}):"
+        await interaction.response.send_message(content, view = view, ephemeral = True)
 
         # We track this interaction so we can delete the message if player presses "Draw"
         #    rather than waiting for the message to delete itself after 20 seconds
@@ -638,41 +752,72 @@ class UnoButtonsBaseGame(discord.ui.View):
         # If the button presser IS the turn player, do the following:
         player = self.manager.game.player_data[interaction.user]
         card_drawn = await self.manager.draw_cards(player)
+        if card_drawn is None:
+            await interaction.response.send_message("There are no cards left to draw!", \
+                ephemeral = True, delete_after = 2)
+            return
         msg = button.label + "! You drew a " + self.manager.color_to_emoji(card_drawn) \
             + " " + card_drawn.value
         await interaction.response.send_message(msg, ephemeral = True, delete_after = 2)
 
         # Announce that player has opted to draw a card and proceed to next turn
         await self.manager.announce(str(interaction.user) + " is drawing a card...")
-        await self.manager.next_turn()
+        await self.manager.next_turn(interaction)
 
 
 
 
 class UnoCardButtons(discord.ui.View):
     """
-    Creates private group of buttons representing the cards in a user's hand
+    Creates private group of buttons representing the cards in a user's hand,
+    one button per kind of card, HAND_PAGE_SIZE buttons per page
     """
     def __init__(self, manager, player):
         super().__init__()
         self.manager = manager
-        self.player_hand = self.manager.get_player_hand(player)
+        self.player = player
+        self.pages = self.manager.get_hand_pages(player)
+        self.is_turn = player == self.manager.game.turn_order[self.manager.game.turn_index]
+        self.page = 0
+        self.show_page()
 
-        for card in self.player_hand:
-            current_turn_player = self.manager.game.turn_order[self.manager.game.turn_index]
-            uno_player = self.manager.game.player_data[player]
-            playable_cards = uno_player.get_playable_cards(self.manager.game.top_card)
-            disabled = (player != current_turn_player) or (card not in playable_cards)
-            self.add_item(CardButton(self.manager, card, disabled))
+    def show_page(self):
+        """
+        Swaps the buttons over to the cards on self.page
+        """
+        self.clear_items()
+        for (index, count, playable) in self.pages[self.page]:
+            self.add_item(CardButton(self.manager, UNO_KIND_CARDS[index], count,
+                                     disabled=not (self.is_turn and playable)))
+        if len(self.pages) > 1:
+            self.add_item(PageButton(-1, "◀", self.page == 0))
+            self.add_item(PageButton(1, "▶", self.page == len(self.pages) - 1))
+
+
+class PageButton(discord.ui.Button):
+    """
+    Button that flips the "Show Hand" menu to the previous or next page
+    """
+    def __init__(self, step, label, disabled):
+        super().__init__(style=discord.ButtonStyle.blurple, label=label, row=4,
+                         disabled=disabled)
+        self.step = step
 
+    async def callback(self, interaction: discord.Interaction):
+        view: UnoCardButtons = self.view
+        view.page += self.step
+        view.show_page()
+        await interaction.response.edit_message(
+            content=f"Your cards (page {view.page + 1}/{len(view.pages)}):", view=view)
 
 
 class CardButton(discord.ui.Button):
     """
-    Button class that represents an individual card in a user's hand
+    Button class that represents the copies of a card in a user's hand
     """
-    def __init__(self, manager, card, disabled=True):
-        super().__init__(style=discord.ButtonStyle.gray, label=f"{card.value}", \
+    def __init__(self, manager, card, count=1, disabled=True):
+        label = card.value if count == 1 else f"{card.value} x{count}"
+        super().__init__(style=discord.ButtonStyle.gray, label=label, \
             emoji=manager.color_to_emoji(card))
         self.manager = manager
         self.card = card
@@ -694,6 +839,7 @@ class UnoWildCard(discord.ui.View):
     def __init__(self, manager):
         super().__init__()
         self.manager = manager
+        self.color = None
 
     @discord.ui.button(label = "Red", style = discord.ButtonStyle.gray, emoji = "🔴")
     async def red(self, interaction: discord.Interaction, button: discord.ui.Button):
@@ -701,7 +847,7 @@ class UnoWildCard(discord.ui.View):
         Changes the wild card to red.
         """
         self.manager.quick_log(f"{interaction.user} pressed {button.label}!")
-        self.manager.game.top_card = Card("Red", "Card")
+        self.color = "Red"
         self.stop()
 
     @discord.ui.button(label = "Blue", style = discord.ButtonStyle.gray, emoji = "🔵")
@@ -710,7 +856,7 @@ class UnoWildCard(discord.ui.View):
         Changes the wild card to blue.
         """
         self.manager.quick_log(f"{interaction.user} pressed {button.label}!")
-        self.manager.game.top_card = Card("Blue", "Card")
+        self.color = "Blue"
         self.stop()
 
     @discord.ui.button(label = "Yellow", style = discord.ButtonStyle.gray, emoji = "🟡")
@@ -719,7 +865,7 @@ class UnoWildCard(discord.ui.View):
         Changes the wild card to yellow.
         """
         self.manager.quick_log(f"{interaction.user} pressed {button.label}!")
-        self.manager.game.top_card = Card("Yellow", "Card")
+        self.color = "Yellow"
         self.stop()
 
     @discord.ui.button(label = "Green", style = discord.ButtonStyle.gray, emoji = "🟢")
@@ -728,7 +874,7 @@ class UnoWildCard(discord.ui.View):
         Changes the wild card to green.
         """
         self.manager.quick_log(f"{interaction.user} pressed {button.label}!")
-        self.manager.game.top_card = Card("Green", "Card")
+        self.color = "Green"
         self.stop()
 
 
@@ -768,11 +914,14 @@ class QuitGameButton(discord.ui.View):
 
 class UnoCard(Card):
     """
-    This class represents an Uno card. On construction, it uses its
-    name and value to establish a priority, used for sorting in a list.
+    This class represents an Uno card. On construction, it looks up
+    its kind (index in UNO_KINDS), used for sorting in a list. Cards in
+    the deck and in hands are the shared objects in UNO_KIND_CARDS,
+    cards that aren't a real Uno card have no kind.
     """
     def __init__(self, name, value):
         super().__init__(name, value)
+        self.kind = UNO_KIND_INDEX.get((name, value))
         
         #This code is likely no longer necessary, however until further testing is performed it may need to be reverted to
         """
@@ -811,6 +960,8 @@ class UnoCard(Card):
     def __eq__(self, other):
         if not isinstance(other, Card):
             return False
+        if self.kind is not None and getattr(other, "kind", None) is not None:
+            return self.kind == other.kind
         if self.name != other.name:
             return False
         if self.value != other.value:
@@ -818,12 +969,362 @@ class UnoCard(Card):
         return True
 
     def __lt__(self, other):
+        if self.kind is not None and getattr(other, "kind", None) is not None:
+            return self.kind < other.kind
         if self.name != other.name:
             return self.name < other.name
         return self.value < other.value
 
     def __gt__(self, other):
         #return self.priority > other.priority
+        if self.kind is not None and getattr(other, "kind", None) is not None:
+            return self.kind > other.kind
         if self.name != other.name:
             return self.name > other.name
         return self.value > other.value
+
+
+
+         #######################################################
+      ####                                                     ####
+    ###                        HAND INDEX                         ###
+      ####                                                     ####
+         #######################################################
+
+UNO_COLORS = ("Red", "Yellow", "Green", "Blue")
+UNO_VALUES = tuple(str(value) for value in range(10)) + ("Draw Two", "Reverse", "Skip")
+# every different Uno card as (color, value), in the order hands are sorted
+# in (the same order sorted() puts UnoCard objects in)
+UNO_KINDS = tuple(sorted([(color, value) for color in UNO_COLORS for value in UNO_VALUES]
+                         + [("Wild", "Wild"), ("Wild", "Draw Four")]))
+UNO_KIND_INDEX = {kind: index for (index, kind) in enumerate(UNO_KINDS)}
+# index in UNO_COLORS of each kind's color, Wild cards are len(UNO_COLORS)
+UNO_KIND_COLOR = tuple(UNO_COLORS.index(color) if color in UNO_COLORS else len(UNO_COLORS)
+                       for (color, _) in UNO_KINDS)
+# one shared card object for each kind, handed out by UnoHand
+UNO_KIND_CARDS = tuple(UnoCard(color, value) for (color, value) in UNO_KINDS)
+# bit of each kind in an UnoHand mask
+WILD_MASK = sum(1 << index for (index, (color, _)) in enumerate(UNO_KINDS) if color == "Wild")
+
+
+def playable_mask(top_card):
+    """
+    Returns the mask of card kinds that can be played on top_card: the
+    same color, the same value or a Wild card
+    """
+    mask = PLAYABLE_MASKS.get((top_card.name, top_card.value))
+    if mask is None:
+        mask = _playable_mask(top_card.name, top_card.value)
+    return mask
+
+
+def _playable_mask(color, value):
+    """
+    Builds the playable mask for a top card of color and value
+    """
+    mask = WILD_MASK
+    for (index, (kind_color, kind_value)) in enumerate(UNO_KINDS):
+        if kind_color == color or kind_value == value:
+            mask |= 1 << index
+    return mask
+
+
+# the placeholder cards a Wild card leaves on top once its color is picked
+WILD_TOP_CARDS = {color: Card(color, "Card") for color in UNO_COLORS}
+
+# playable mask of every card that can be on top, including the "Card"
+# placeholders a Wild card leaves behind once its color is picked
+PLAYABLE_MASKS = {(color, value): _playable_mask(color, value)
+                  for (color, value) in UNO_KINDS + tuple((color, "Card") for color in UNO_COLORS)}
+
+
+class UnoHand():
+    """
+    A player's hand of Uno cards, kept as a count of each kind of card
+    in UNO_KINDS and a mask with the bit of every kind the hand has at
+    least one of. Cards come out sorted without sorting anything, and the
+    playable cards are one AND of the mask with playable_mask().
+    version goes up every time the hand changes, colors counts the cards
+    of each color (see UNO_KIND_COLOR).
+    """
+    def __init__(self):
+        self.counts = [0] * len(UNO_KINDS)
+        self.colors = [0] * (len(UNO_COLORS) + 1)
+        self.mask = 0
+        self.size = 0
+        self.version = 0
+
+    def __len__(self):
+        return self.size
+
+    def __iter__(self):
+        return self.cards_in(self.mask)
+
+    def __contains__(self, card):
+        return getattr(card, "kind", None) is not None and self.counts[card.kind] > 0
+
+    def __str__(self):
+        return ", ".join(str(card) for card in self)
+
+    def add(self, card):
+        """
+        Adds a card to the hand
+        """
+        index = card.kind
+        self.counts[index] += 1
+        self.colors[UNO_KIND_COLOR[index]] += 1
+        self.mask |= 1 << index
+        self.size += 1
+        self.version += 1
+
+    def remove(self, card):
+        """
+        Removes a card from the hand, raises ValueError if it isn't there
+        """
+        index = card.kind
+        if self.counts[index] == 0:
+            raise ValueError(f"{card} is not in the hand")
+        self.counts[index] -= 1
+        self.colors[UNO_KIND_COLOR[index]] -= 1
+        if self.counts[index] == 0:
+            self.mask &= ~(1 << index)
+        self.size -= 1
+        self.version += 1
+
+    def clear(self):
+        """
+        Empties the hand
+        """
+        self.counts = [0] * len(UNO_KINDS)
+        self.colors = [0] * (len(UNO_COLORS) + 1)
+        self.mask = 0
+        self.size = 0
+        self.version += 1
+
+    def playable(self, top_card):
+        """
+        Returns the mask of kinds in the hand that can be played on top_card
+        """
+        return self.mask & playable_mask(top_card)
+
+    def kinds(self):
+        """
+        Yields (kind index, count) for every kind in the hand, in sorted order
+        """
+        mask = self.mask
+        while mask:
+            lowest = mask & -mask
+            index = lowest.bit_length() - 1
+            yield (index, self.counts[index])
+            mask ^= lowest
+
+    def cards_in(self, mask):
+        """
+        Yields the cards of the kinds in mask, in sorted order, as many
+        times as the hand has them
+        """
+        while mask:
+            lowest = mask & -mask
+            index = lowest.bit_length() - 1
+            card = UNO_KIND_CARDS[index]
+            for _ in range(self.counts[index]):
+                yield card
+            mask ^= lowest
+
+
+
+         #######################################################
+      ####                                                     ####
+    ###                           DECK                            ###
+      ####                                                     ####
+         #######################################################
+
+def generate_uno_deck():
+    '''
+    generate_uno_deck: Returns the kind of each of the 108 card ids in
+    accordance with the requirements of an Uno deck:
+        a. One '0' card for each color 'Red', 'Blue', 'Green', 'Yellow'
+        b. Two cards for each color for each number "1-9"
+        c. Two cards for each color for each "Skip", "Reverse", and
+           "Draw Two".
+        d. Four "Wild" cards and four "Wild Draw Four" cards.
+        e. Total of 108 cards.
+    '''
+    deck = []
+    for color in UNO_COLORS:
+        deck.append(UNO_KIND_INDEX[(color, '0')])
+        for value in range(1, 10):
+            deck.append(UNO_KIND_INDEX[(color, str(value))])
+            deck.append(UNO_KIND_INDEX[(color, str(value))])
+        for value in range(2):
+            deck.append(UNO_KIND_INDEX[(color, "Draw Two")])
+            deck.append(UNO_KIND_INDEX[(color, "Reverse")])
+            deck.append(UNO_KIND_INDEX[(color, "Skip")])
+    for value in range(4):
+        deck.append(UNO_KIND_INDEX[("Wild", "Wild")])
+        deck.append(UNO_KIND_INDEX[("Wild", "Draw Four")])
+    return array("B", deck)
+
+
+# kind of every card id, shared by every game
+UNO_DECK = generate_uno_deck()
+
+
+def shuffle_ids(ids, size, rng=random):
+    """
+    Fisher-Yates shuffle of the first size ids of an array, in place
+    """
+    for i in range(size - 1, 0, -1):
+        j = int(rng.random() * (i + 1))
+        (ids[i], ids[j]) = (ids[j], ids[i])
+
+
+class UnoDeck():
+    """
+    The draw pile and discard pile of an Uno game, as the kinds of
+    their cards in two fixed size arrays. The draw pile is cards[:size]
+    with the top card at the end, the discard pile is discard[:discard_size].
+    Cards handed out are the shared UNO_KIND_CARDS objects, so drawing,
+    discarding and reshuffling never make new objects. discard_colors
+    counts the discarded cards of each color (see UNO_KIND_COLOR).
+    """
+    def __init__(self):
+        self.cards = array("B", UNO_DECK)
+        self.size = len(UNO_DECK)
+        self.discard = array("B", bytes(len(UNO_DECK)))
+        self.discard_size = 0
+        self.discard_colors = [0] * (len(UNO_COLORS) + 1)
+        # how many times the discard pile was shuffled back in
+        self.reshuffles = 0
+
+    def __len__(self):
+        return self.size
+
+    def reset(self):
+        """
+        Puts every card back in the draw pile, in generate_uno_deck order
+        """
+        self.cards[:] = UNO_DECK
+        self.size = len(UNO_DECK)
+        self.discard_size = 0
+        self.discard_colors = [0] * (len(UNO_COLORS) + 1)
+        self.reshuffles = 0
+
+    def shuffle(self, rng=random):
+        """
+        Shuffles the draw pile
+        """
+        shuffle_ids(self.cards, self.size, rng)
+
+    def draw(self):
+        """
+        Takes the top card off of the draw pile
+        """
+        if self.size == 0:
+            raise IndexError("draw from an empty Uno deck")
+        self.size -= 1
+        return UNO_KIND_CARDS[self.cards[self.size]]
+
+    def discard_card(self, card):
+        """
+        Puts a card on the discard pile
+        """
+        self.discard[self.discard_size] = card.kind
+        self.discard_size += 1
+        self.discard_colors[UNO_KIND_COLOR[card.kind]] += 1
+
+    def reshuffle(self, rng=random):
+        """
+        Shuffles the discard pile and puts it under the draw pile
+        """
+        count = self.discard_size
+        if self.size:
+            self.cards[count:count + self.size] = self.cards[:self.size]
+        self.cards[:count] = self.discard[:count]
+        shuffle_ids(self.cards, count, rng)
+        self.size += count
+        self.discard_size = 0
+        self.discard_colors = [0] * (len(UNO_COLORS) + 1)
+        self.reshuffles += 1
+
+
+
+         #######################################################
+      ####                                                     ####
+    ###                       CPU PLAYERS                         ###
+      ####                                                     ####
+         #######################################################
+
+# most CPU players that can be added to a game (see the /uno command)
+MAX_CPUS = 5
+# cards of each color in the deck
+UNO_COLOR_TOTAL = 25
+# how much a CPU player wants the top card to be in a color the other
+# players are unlikely to have, against holding more cards of that color
+CPU_UNSEEN_WEIGHT = 4
+# what playing a Wild card costs, so they're kept for when nothing else fits
+CPU_WILD_PENALTY = 3
+# the next player is attacked with Skip and Draw cards once they have this few cards
+CPU_ATTACK_HAND_SIZE = 2
+CPU_ATTACK_BONUS = 4
+# what using a Skip or Draw card costs when the next player isn't close to winning
+CPU_ATTACK_SAVE_PENALTY = 0.5
+CPU_ATTACK_CARDS = ("Skip", "Draw Two", "Draw Four")
+
+
+def unseen_colors(game, hand):
+    """
+    Returns how many cards of each color in UNO_COLORS a player hasn't
+    seen: not in their hand, not on top and not in the discard pile
+    """
+    top = getattr(game.top_card, "kind", None)
+    top_color = UNO_KIND_COLOR[top] if top is not None else None
+    return [UNO_COLOR_TOTAL - hand.colors[color] - game.deck.discard_colors[color]
+            - (color == top_color) for color in range(len(UNO_COLORS))]
+
+
+def choose_cpu_move(game, user):
+    """
+    Picks a CPU player's move. Returns (card, color), color is only set
+    for Wild cards, and card is None when the player has to draw.
+
+    Every playable kind of card gets a score: how many cards the player
+    keeps in the color the top card would be, less CPU_UNSEEN_WEIGHT
+    times the share of the unseen cards in that color (so the others
+    are less likely to follow). Wild cards pick their best color but
+    cost CPU_WILD_PENALTY, and Skip and Draw cards are saved until the
+    next player is down to CPU_ATTACK_HAND_SIZE cards.
+    """
+    hand = game.player_data[user].hand
+    playable = hand.playable(game.top_card)
+    if not playable:
+        return (None, None)
+    unseen = unseen_colors(game, hand)
+    unseen_total = max(sum(unseen), 1)
+    next_user = game.turn_order[game.get_next_turn_index()]
+    attack = len(game.player_data[next_user].hand) <= CPU_ATTACK_HAND_SIZE
+    # what it's worth for the top card to end up in each color
+    color_scores = [hand.colors[color] - CPU_UNSEEN_WEIGHT * unseen[color] / unseen_total
+                    for color in range(len(UNO_COLORS))]
+    best_color = max(range(len(UNO_COLORS)), key=color_scores.__getitem__)
+
+    best = (None, None)
+    best_score = None
+    while playable:
+        lowest = playable & -playable
+        index = lowest.bit_length() - 1
+        playable ^= lowest
+        card = UNO_KIND_CARDS[index]
+        color = UNO_KIND_COLOR[index]
+        if color == len(UNO_COLORS):
+            score = color_scores[best_color] - CPU_WILD_PENALTY
+            move = (card, UNO_COLORS[best_color])
+        else:
+            # the card itself leaves the hand
+            score = color_scores[color] - 1
+            move = (card, None)
+        if card.value in CPU_ATTACK_CARDS:
+            score += CPU_ATTACK_BONUS if attack else -CPU_ATTACK_SAVE_PENALTY
+        if best_score is None or score > best_score:
+            (best, best_score) = (move, score)
+    return best
@@ -1,5 +1,7 @@
+import asyncio
 import random
 import logging
+import time
 import discord
 
 class Card:
@@ -27,6 +29,83 @@ class Card:
     def __repr__(self):
         return "<name=" + str(self.name) + " value=" + str(self.value) + ">"
 
+class CpuUser:
+    """
+    Stands in for a discord user in a game's player data and turn
+    order when a seat is played by the computer
+    """
+    def __init__(self, number):
+        self.number = number
+        self.display_name = f"CPU {number}"
+        self.name = self.display_name
+        self.mention = f"**{self.display_name}**"
+
+    def __str__(self):
+        return self.display_name
+
+    def __repr__(self):
+        return f"<CpuUser number={self.number}>"
+
+class LiveMessage:
+    """
+    A message that gets edited as its content changes, instead of
+    sending a new message every time. Edits are throttled to one every
+    min_interval seconds: changes made in between are combined into
+    one delayed edit, and flush() sends anything still pending. Edits
+    take turns on a lock, so an older edit can't land after a newer one.
+    """
+    def __init__(self, channel, min_interval=1.0):
+        self.channel = channel
+        self.min_interval = min_interval
+        self.message = None
+        self.content = ""
+        self.last_edit = 0.0
+        self.pending_edit = None
+        self.dirty = False
+        self.edit_lock = asyncio.Lock()
+
+    async def set_content(self, content):
+        """
+        Changes the content of the message, sending it the first time
+        """
+        self.content = content
+        if self.message is None:
+            self.message = await self.channel.send(content)
+            self.last_edit = time.monotonic()
+            return
+        self.dirty = True
+        if self.pending_edit is not None:
+            return
+        wait = self.last_edit + self.min_interval - time.monotonic()
+        if wait <= 0:
+            await self._edit()
+        else:
+            self.pending_edit = asyncio.create_task(self._edit_later(wait))
+
+    async def flush(self):
+        """
+        Makes the message show its latest content right away, after any
+        edit that is already being sent
+        """
+        if self.pending_edit is not None:
+            # only stops the wait, an edit it already started is shielded
+            self.pending_edit.cancel()
+            self.pending_edit = None
+        await self._edit()
+
+    async def _edit_later(self, wait):
+        await asyncio.sleep(wait)
+        self.pending_edit = None
+        await asyncio.shield(self._edit())
+
+    async def _edit(self):
+        async with self.edit_lock:
+            if not self.dirty:
+                return
+            self.dirty = False
+            self.last_edit = time.monotonic()
+            await self.message.edit(content=self.content)
+
 class Deck:
     """
     Contains cards and their weights to make drawing easy. Due to